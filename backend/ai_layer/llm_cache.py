@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".warehouse_mvp", "llm_responses")
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+class LLMResponseCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 50 * 1024 ** 2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger("LLMResponseCache")
+
+    @staticmethod
+    def make_key(query: str, snapshot_version: str, template: str, model: str = "") -> str:
+        template_hash = hashlib.sha256(template.encode()).hexdigest()
+        raw = json.dumps([normalize_query(query), snapshot_version, template_hash, model])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                answer = json.load(f)["answer"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return answer
+
+    def put(self, key: str, answer: str):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._entry_path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"answer": answer, "created_at": time.time()}, f)
+            os.replace(tmp_path, self._entry_path(key))
+            self.evict()
+        except OSError as e:
+            self.logger.warning(f"Could not cache LLM response: {str(e)}")
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        paths = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+        return sorted((os.stat(p).st_mtime, os.path.getsize(p), p) for p in paths)
+
+    def evict(self):
+        # Least recently used first; hits refresh the mtime
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def purge(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+class StubLLM:
+    # Offline stand-in with the LangChain LLM invoke() interface and fixed latency
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.model_name = f"stub-{latency}"
+
+    def invoke(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        return f"[stub answer {digest}] prompt had {len(prompt)} characters"
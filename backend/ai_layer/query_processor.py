@@ -1,72 +1,163 @@
+import logging
+import os
 import pandas as pd
-import plotly.express as px
-from langchain.chains import create_sql_query_chain
-from langchain.utilities import SQLDatabase
-from langchain_community.llms import OpenAI
-from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
-from langchain_core.prompts import PromptTemplate
 from backend.database.database_connector import BaserowConnector
+from backend.database.snapshot_cache import TableSnapshotCache, snapshot_cache
+from backend.ai_layer.rollups import SalesRollups
+from backend.ai_layer.llm_cache import LLMResponseCache, StubLLM
+from backend.stage_metrics import stage_metrics
+
+TEXT_PROMPT = """You are a warehouse sales analyst answering questions about a sales table.
+Columns: {columns}
+Rows: {rows}
+Totals: {totals}
+
+Question: {query}
+Answer in one or two sentences."""
 
 class AIQueryProcessor:
-    def __init__(self, connector: BaserowConnector):
+    def __init__(self, connector: BaserowConnector, snapshots: TableSnapshotCache = snapshot_cache,
+                 llm=None, response_cache: LLMResponseCache = None):
         self.connector = connector
-        self.llm = OpenAI(temperature=0)
+        self.snapshots = snapshots
+        self.response_cache = response_cache if response_cache is not None else LLMResponseCache()
+        self._snapshot_state = {}
+        self._llm = llm
+        # AI_LLM_BACKEND=stub swaps in the offline model for load tests and benchmarks
+        self.llm_backend = type(llm).__name__ if llm is not None else os.getenv("AI_LLM_BACKEND", "openai")
+        self.use_llm = llm is not None or bool(os.getenv("AI_LLM_BACKEND") or os.getenv("OPENAI_API_KEY"))
+        self.logger = logging.getLogger("AIQueryProcessor")
+    
+    @property
+    def llm(self):
+        # Built on first use; LangChain and the OpenAI client are slow to import
+        if self._llm is None:
+            if self.llm_backend == "stub":
+                self._llm = StubLLM(latency=float(os.getenv("AI_STUB_LATENCY", "0.05")))
+            else:
+                from langchain_community.llms import OpenAI
+                self._llm = OpenAI(temperature=0)
+        return self._llm
     
     def process_query(self, query: str, table_id: str):
+        with stage_metrics.timer("ai_query", "query"):
+            return self._process_query(query, table_id)
+    
+    def _process_query(self, query: str, table_id: str):
         # Retrieve data from Baserow
-        data = self._retrieve_table_data(table_id)
-        df = pd.DataFrame(data)
+        df = self._retrieve_table_data(table_id)
         
         # Simple question answering
         if "how many" in query.lower():
-            return self._answer_count_question(df, query)
+            return self._answer_count_question(table_id, df, query)
         
         # Visualization requests
         if "chart" in query.lower() or "graph" in query.lower():
-            return self._generate_visualization(df, query)
+            return self._generate_visualization(self._table_rollups(table_id, df), query)
         
         # Fallback to text response
-        return self._text_response(df, query)
+        return self._text_response(table_id, df, query)
     
-    def _retrieve_table_data(self, table_id: str):
-        response = requests.get(
-            f"{self.connector.base_url}/api/database/rows/table/{table_id}/?user_field_names=true",
-            headers=self.connector.headers
-        )
-        response.raise_for_status()
-        return response.json()['results']
+    def _retrieve_table_data(self, table_id: str) -> pd.DataFrame:
+        # Snapshots are shared, so callers must not modify the returned frame
+        loaded = []
+        
+        def loader():
+            loaded.append(True)
+            return self.connector.read_dataframe(table_id)
+        
+        with stage_metrics.timer("ai_query", "retrieve") as timing:
+            df = self.snapshots.get(self.connector.base_url, table_id, loader)
+            timing.rows = len(df)
+        stage_metrics.record_cache("ai_query", "table_snapshot", hits=int(not loaded), misses=int(bool(loaded)))
+        return df
+    
+    def _state(self, table_id: str, df: pd.DataFrame) -> dict:
+        # Derived data is built once per table snapshot; a new snapshot object means the data changed
+        state = self._snapshot_state.get(table_id)
+        if state is None or state['df'] is not df:
+            state = {'df': df}
+            self._snapshot_state[table_id] = state
+        return state
     
-    def _answer_count_question(self, df, query):
+    def _table_rollups(self, table_id: str, df: pd.DataFrame) -> SalesRollups:
+        state = self._state(table_id, df)
+        if 'rollups' not in state:
+            with stage_metrics.timer("ai_query", "rollups", len(df)):
+                state['rollups'] = SalesRollups().update(df)
+        return state['rollups']
+    
+    def _snapshot_fingerprint(self, table_id: str, df: pd.DataFrame) -> str:
+        # Content-based, so cached answers survive reloads of unchanged data and restarts
+        state = self._state(table_id, df)
+        if 'fingerprint' not in state:
+            with stage_metrics.timer("ai_query", "fingerprint", len(df)):
+                state['fingerprint'] = self._hash_snapshot(table_id, df)
+        return state['fingerprint']
+    
+    def _hash_snapshot(self, table_id: str, df: pd.DataFrame) -> str:
+        try:
+            hashed = pd.util.hash_pandas_object(df, index=False)
+        except TypeError:
+            hashed = pd.util.hash_pandas_object(df.astype(str), index=False)
+        return f"{table_id}:{len(df)}:{int(hashed.sum())}:{','.join(map(str, df.columns))}"
+    
+    def _answer_count_question(self, table_id, df, query):
+        totals = self._table_rollups(table_id, df).totals()
         if "orders" in query.lower():
-            count = df['order_id'].nunique()
-            return {'type': 'text', 'content': f"Total Orders: {count}"}
+            return {'type': 'text', 'content': f"Total Orders: {totals['total_orders']}"}
         elif "products" in query.lower():
-            count = df['MSKU'].nunique()
-            return {'type': 'text', 'content': f"Unique Products: {count}"}
+            return {'type': 'text', 'content': f"Unique Products: {totals['unique_products']}"}
         elif "revenue" in query.lower():
-            total = df['price'].sum()
-            return {'type': 'text', 'content': f"Total Revenue: ${total:,.2f}"}
+            return {'type': 'text', 'content': f"Total Revenue: ${totals['total_revenue']:,.2f}"}
         else:
-            return self._text_response(df, query)
+            return self._text_response(table_id, df, query)
+    
+    def _generate_visualization(self, rollups, query):
+        with stage_metrics.timer("ai_query", "visualization"):
+            return self._build_chart(rollups, query)
     
-    def _generate_visualization(self, df, query):
+    def _build_chart(self, rollups, query):
+        import plotly.express as px
+        
         if "sales over time" in query.lower():
-            df['order_date'] = pd.to_datetime(df['order_date'])
-            df['month'] = df['order_date'].dt.to_period('M')
-            monthly_sales = df.groupby('month')['price'].sum().reset_index()
-            fig = px.line(monthly_sales, x='month', y='price', title="Monthly Sales Trend")
+            monthly_sales = rollups.table('month')
+            fig = px.line(monthly_sales, x='month', y='revenue', title="Monthly Sales Trend")
             return {'type': 'chart', 'content': fig}
         
         if "top products" in query.lower():
-            top_products = df.groupby('MSKU')['price'].sum().nlargest(10).reset_index()
-            fig = px.bar(top_products, x='MSKU', y='price', title="Top Selling Products")
+            top_products = rollups.table('msku').nlargest(10, 'revenue')
+            fig = px.bar(top_products, x='msku', y='revenue', title="Top Selling Products")
             return {'type': 'chart', 'content': fig}
         
         return {'type': 'text', 'content': "Could not generate visualization for your query"}
     
-    def _text_response(self, df, query):
+    def _text_response(self, table_id, df, query):
         # Simple text response for other queries
-        return {
+        fallback = {
             'type': 'text',
             'content': f"I processed your query: '{query}'. The dataset contains {len(df)} records."
-        }
\ No newline at end of file
+        }
+        if not self.use_llm:
+            return fallback
+        
+        key = LLMResponseCache.make_key(
+            query, self._snapshot_fingerprint(table_id, df), TEXT_PROMPT, self.llm_backend
+        )
+        answer = self.response_cache.get(key)
+        stage_metrics.record_cache("ai_query", "llm_response", hits=int(answer is not None), misses=int(answer is None))
+        if answer is None:
+            prompt = TEXT_PROMPT.format(
+                columns=", ".join(map(str, df.columns)),
+                rows=len(df),
+                totals=self._table_rollups(table_id, df).totals(),
+                query=query
+            )
+            try:
+                with stage_metrics.timer("ai_query", "llm"):
+                    answer = str(self.llm.invoke(prompt))
+            except Exception as e:
+                self.logger.error(f"LLM call failed: {str(e)}")
+                return fallback
+            self.response_cache.put(key, answer)
+        return {'type': 'text', 'content': answer}
\ No newline at end of file
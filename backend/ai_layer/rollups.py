@@ -0,0 +1,101 @@
+from collections import Counter
+from typing import Dict, Optional
+
+import pandas as pd
+
+# Rollup name -> column role it groups by
+DIMENSIONS = {
+    'month': 'date',
+    'msku': 'msku',
+    'marketplace': 'marketplace',
+    'fulfillment_center': 'fulfillment_center',
+}
+
+class SalesRollups:
+    def __init__(self, order_col: str = 'order_id', price_col: str = 'price',
+                 date_col: str = 'order_date', msku_col: str = 'MSKU',
+                 marketplace_col: str = 'marketplace',
+                 fulfillment_center_col: str = 'fulfillment_center'):
+        self.columns = {
+            'order': order_col,
+            'price': price_col,
+            'date': date_col,
+            'msku': msku_col,
+            'marketplace': marketplace_col,
+            'fulfillment_center': fulfillment_center_col,
+        }
+        self.total_revenue = 0.0
+        self.order_ids = set()
+        self._revenue = {dim: pd.Series(dtype=float) for dim in DIMENSIONS}
+        self._orders = {dim: Counter() for dim in DIMENSIONS}
+        # (group, order_id) pairs already counted, so a re-sent order is not counted twice
+        self._order_keys = {dim: set() for dim in DIMENSIONS}
+
+    def _group_keys(self, df: pd.DataFrame, dim: str,
+                    marketplace: Optional[str] = None) -> Optional[pd.Series]:
+        col = self.columns[DIMENSIONS[dim]]
+        if not col or col not in df.columns:
+            # Uploads are per marketplace, so the rows may not carry it themselves
+            if dim == 'marketplace' and marketplace:
+                return pd.Series(marketplace, index=df.index)
+            return None
+        if dim == 'month':
+            return pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m')
+        return df[col]
+
+    def update(self, df: pd.DataFrame, marketplace: Optional[str] = None) -> 'SalesRollups':
+        order_col = self.columns['order']
+        price_col = self.columns['price']
+        price = (
+            pd.to_numeric(df[price_col], errors='coerce')
+            if price_col in df.columns else pd.Series(0.0, index=df.index)
+        )
+        orders = df[order_col] if order_col in df.columns else None
+
+        self.total_revenue += price.sum()
+        if orders is not None:
+            self.order_ids.update(orders.dropna().unique())
+
+        for dim in DIMENSIONS:
+            keys = self._group_keys(df, dim, marketplace)
+            if keys is None:
+                continue
+            # Categorical keys (typed report columns) would otherwise emit every category
+            revenue = price.groupby(keys, observed=True).sum()
+            self._revenue[dim] = self._revenue[dim].add(revenue, fill_value=0)
+            if orders is not None:
+                pairs = pd.DataFrame({'key': keys, 'order': orders}).dropna().drop_duplicates()
+                seen = self._order_keys[dim]
+                for key, order in zip(pairs['key'], pairs['order']):
+                    if (key, order) not in seen:
+                        seen.add((key, order))
+                        self._orders[dim][key] += 1
+        return self
+
+    def merge(self, other: 'SalesRollups') -> 'SalesRollups':
+        self.total_revenue += other.total_revenue
+        self.order_ids |= other.order_ids
+        for dim in DIMENSIONS:
+            self._revenue[dim] = self._revenue[dim].add(other._revenue[dim], fill_value=0)
+            for key, order in other._order_keys[dim]:
+                if (key, order) not in self._order_keys[dim]:
+                    self._order_keys[dim].add((key, order))
+                    self._orders[dim][key] += 1
+        return self
+
+    def table(self, dim: str) -> pd.DataFrame:
+        revenue = self._revenue[dim]
+        return pd.DataFrame({
+            dim: revenue.index,
+            'revenue': revenue.values,
+            'orders': [self._orders[dim].get(key, 0) for key in revenue.index],
+        }).sort_values(dim, ignore_index=True)
+
+    def totals(self) -> Dict:
+        total_orders = len(self.order_ids)
+        return {
+            'total_orders': total_orders,
+            'total_revenue': self.total_revenue,
+            'unique_products': len(self._revenue['msku']),
+            'avg_order_value': self.total_revenue / total_orders if total_orders else 0
+        }
@@ -0,0 +1,163 @@
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+MAX_RECORDED_FAILURES = 100
+
+class ExportJob:
+    def __init__(self, table_id: str, fmt: str, replace: bool):
+        self.id = uuid.uuid4().hex
+        self.table_id = table_id
+        self.format = fmt
+        self.replace = replace
+        self.status = "receiving"
+        self.rows_received = 0
+        self.rows_sent = 0
+        self.rows_failed = 0
+        self.failures: List[Dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def record_failure(self, rows: int, error: str, line: Optional[int] = None):
+        self.rows_failed += rows
+        if len(self.failures) < MAX_RECORDED_FAILURES:
+            self.failures.append({"line": line, "rows": rows, "error": error})
+
+    def progress(self) -> Dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "table_id": self.table_id,
+            "status": self.status,
+            "rows_received": self.rows_received,
+            "rows_sent": self.rows_sent,
+            "rows_failed": self.rows_failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows_sent / elapsed, 1) if elapsed else 0.0
+        }
+
+class ExportJobManager:
+    def __init__(self, connector, max_running_jobs: int = 2, queue_size: int = 4,
+                 batch_size: int = 200, max_jobs: int = 100, spool_dir: Optional[str] = None):
+        self.connector = connector
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_jobs = max_jobs
+        self.spool_dir = spool_dir
+        self.jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._running = asyncio.Semaphore(max_running_jobs)
+        self._tasks = set()
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self.jobs.get(job_id)
+
+    def _remember(self, job: ExportJob):
+        self.jobs[job.id] = job
+        # Forget the oldest finished jobs once the history is full
+        for old_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[old_id].finished_at is not None:
+                del self.jobs[old_id]
+
+    async def submit(self, table_id: str, body: AsyncIterator[bytes], fmt: str = "ndjson",
+                     replace: bool = False) -> ExportJob:
+        job = ExportJob(table_id, fmt, replace)
+        self._remember(job)
+
+        # Spool the upload to disk so request memory stays at one network chunk
+        fd, path = tempfile.mkstemp(prefix=f"export-{job.id}-", suffix=f".{fmt}", dir=self.spool_dir)
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                async for chunk in body:
+                    spool.write(chunk)
+        except Exception as e:
+            os.remove(path)
+            job.status = "failed"
+            job.finished_at = time.time()
+            job.record_failure(0, f"Upload interrupted: {str(e)}")
+            return job
+
+        job.status = "queued"
+        task = asyncio.create_task(self._run(job, path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _parse_rows(self, job: ExportJob, path: str) -> Iterator[Tuple[int, Dict]]:
+        with open(path, newline="", encoding="utf-8") as f:
+            if job.format == "csv":
+                for line, row in enumerate(csv.DictReader(f), start=2):
+                    if None in row:
+                        job.record_failure(1, "Row has more fields than the header", line)
+                        continue
+                    yield line, row
+                return
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as e:
+                    job.record_failure(1, f"Invalid JSON: {str(e)}", line)
+                    continue
+                if not isinstance(row, dict):
+                    job.record_failure(1, "Expected a JSON object per line", line)
+                    continue
+                yield line, row
+
+    async def _produce(self, job: ExportJob, path: str, queue: asyncio.Queue):
+        try:
+            batch = []
+            first_line = None
+            for line, row in self._parse_rows(job, path):
+                job.rows_received += 1
+                if not batch:
+                    first_line = line
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    # Blocks while the sender is behind: this is the backpressure
+                    await queue.put((first_line, batch))
+                    batch = []
+            if batch:
+                await queue.put((first_line, batch))
+        finally:
+            await queue.put(None)
+
+    async def _run(self, job: ExportJob, path: str):
+        try:
+            async with self._running:
+                job.status = "running"
+                job.started_at = time.time()
+                if job.replace:
+                    rows = await self.connector.read_rows(job.table_id)
+                    await self.connector.delete_rows(job.table_id, [row['id'] for row in rows])
+
+                queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+                producer = asyncio.create_task(self._produce(job, path, queue))
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    line, batch = item
+                    try:
+                        await self.connector.create_rows(job.table_id, batch)
+                        job.rows_sent += len(batch)
+                    except Exception as e:
+                        job.record_failure(len(batch), str(e), line)
+                await producer
+                job.status = "completed_with_errors" if job.rows_failed else "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.record_failure(0, str(e))
+        finally:
+            job.finished_at = time.time()
+            os.remove(path)
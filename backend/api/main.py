@@ -1,6 +1,10 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from database.database_connector import BaserowConnector, ExportRequest
+from database.database_connector import ExportRequest
+from database.async_connector import AsyncBaserowConnector
+from api.jobs import ExportJobManager
+from stage_metrics import stage_metrics
 from dotenv import load_dotenv
 import os
 
@@ -13,21 +17,72 @@ app = FastAPI()
 BASEROW_URL = os.getenv("BASEROW_URL", "https://api.baserow.io")
 BASEROW_TOKEN = os.getenv("BASEROW_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+BASEROW_CONCURRENCY = int(os.getenv("BASEROW_CONCURRENCY", "4"))
+EXPORT_JOB_LIMIT = int(os.getenv("EXPORT_JOB_LIMIT", "2"))
 
-connector = BaserowConnector(BASEROW_URL, BASEROW_TOKEN)
+connector = None
+jobs = None
 
-# Example LangChain use
-from langchain_openai import ChatOpenAI
-llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY)
+@app.on_event("startup")
+async def open_connector():
+    global connector, jobs
+    connector = AsyncBaserowConnector(BASEROW_URL, BASEROW_TOKEN, concurrency=BASEROW_CONCURRENCY)
+    jobs = ExportJobManager(connector, max_running_jobs=EXPORT_JOB_LIMIT, batch_size=connector.batch_size)
+
+@app.on_event("shutdown")
+async def close_connector():
+    await connector.aclose()
+
+_llm = None
+
+def get_llm():
+    # LangChain is only imported once something actually needs the model
+    global _llm
+    if _llm is None:
+        from langchain_openai import ChatOpenAI
+        _llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY)
+    return _llm
 
 @app.post("/export/")
 async def export_data(request: ExportRequest):
     try:
-        connector.export_data(request)
-        return {"message": "Data exported successfully"}
+        counts = await connector.export_data(request)
+        return {"message": "Data exported successfully", "counts": counts}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs/export/{table_id}", status_code=202)
+async def submit_export_job(table_id: str, request: Request, format: str = None, replace: bool = False):
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    job = await jobs.submit(table_id, request.stream(), format, replace)
+    return job.progress()
+
+@app.get("/jobs/")
+async def list_jobs():
+    return [job.progress() for job in jobs.jobs.values()]
+
+@app.get("/jobs/{job_id}")
+async def job_progress(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.progress()
+
+@app.get("/jobs/{job_id}/failures")
+async def job_failures(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job.id, "rows_failed": job.rows_failed, "failures": job.failures}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(stage_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health/")
 async def health_check():
     return {"status": "ok"}
@@ -0,0 +1,210 @@
+import asyncio
+import math
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from .database_connector import (
+    BASEROW_BATCH_LIMIT,
+    ExportRequest,
+    is_retryable,
+    plan_sync,
+)
+from .snapshot_cache import snapshot_cache
+try:
+    from ..stage_metrics import stage_metrics
+except ImportError:
+    from stage_metrics import stage_metrics
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class AsyncBaserowConnector:
+    def __init__(self, base_url: str, api_token: str, batch_size: int = BASEROW_BATCH_LIMIT,
+                 concurrency: int = 4, timeout: float = 30, max_retries: int = 5,
+                 backoff_factor: float = 0.5):
+        self.base_url = base_url.rstrip('/')
+        self.api_token = api_token
+        self.headers = {
+            "Authorization": f"Token {api_token}",
+            "Content-Type": "application/json"
+        }
+        self.batch_size = max(1, min(batch_size, BASEROW_BATCH_LIMIT))
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retries = 0
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        # Bounds requests in flight across every export sharing this connector
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            async with self._slots:
+                try:
+                    response = await self.client.request(method, path, **kwargs)
+                except httpx.TransportError as e:
+                    # A POST that may have reached the server is not resent; it could
+                    # already have created its rows
+                    sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                    if attempt >= self.max_retries or (sent and method.upper() == "POST"):
+                        raise
+                    response = None
+            if response is not None:
+                if not is_retryable(method, response.status_code) or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = _retry_after(response)
+            else:
+                delay = None
+            if delay is None:
+                delay = self.backoff_factor * (2 ** attempt)
+            attempt += 1
+            self.retries += 1
+            # Sleep outside the semaphore so waiting retries don't hold a slot
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def test_connection(self):
+        return (await self._request("GET", "/api/database/tables/")).json()
+
+    async def _fetch_page(self, table_id: str, page: int, page_size: int) -> Dict:
+        with stage_metrics.timer("baserow", "fetch_page") as timing:
+            response = await self._request(
+                "GET",
+                f"/api/database/rows/table/{table_id}/",
+                params={"user_field_names": "true", "page": page, "size": page_size}
+            )
+            data = response.json()
+            timing.rows = len(data.get('results', []))
+        return data
+
+    async def iter_pages(self, table_id: str,
+                         page_size: int = BASEROW_BATCH_LIMIT) -> AsyncIterator[List[Dict]]:
+        page_size = max(1, min(page_size, BASEROW_BATCH_LIMIT))
+        data = await self._fetch_page(table_id, 1, page_size)
+        yield data['results']
+        if not data.get('next'):
+            return
+
+        last_page = max(2, math.ceil(data['count'] / page_size))
+        for start in range(2, last_page + 1, self.concurrency):
+            pages = range(start, min(start + self.concurrency, last_page + 1))
+            for data in await asyncio.gather(*(self._fetch_page(table_id, p, page_size) for p in pages)):
+                yield data['results']
+
+        # Rows added while reading push the table past the counted pages
+        page = last_page
+        while data.get('next'):
+            page += 1
+            data = await self._fetch_page(table_id, page, page_size)
+            yield data['results']
+
+    async def read_rows(self, table_id: str, page_size: int = BASEROW_BATCH_LIMIT) -> List[Dict]:
+        rows = []
+        async for page in self.iter_pages(table_id, page_size):
+            rows.extend(page)
+        return rows
+
+    def _batches(self, items: List):
+        for i in range(0, len(items), self.batch_size):
+            yield items[i:i+self.batch_size]
+
+    async def _send_batch(self, method: str, path: str, batch: List, stage: str, **kwargs) -> httpx.Response:
+        with stage_metrics.timer("baserow", stage, len(batch)):
+            return await self._request(method, path, json={"items": batch}, **kwargs)
+
+    async def _send_batches(self, method: str, table_id: str, path: str, items: List,
+                            stage: str = "batch", **kwargs) -> List[Dict]:
+        if not items:
+            return []
+        # Every batch is in flight at once, up to the concurrency limit; responses are
+        # collected by batch index, so results line up with the input rows
+        tasks = [
+            asyncio.ensure_future(self._send_batch(method, path, batch, stage, **kwargs))
+            for batch in self._batches(items)
+        ]
+        try:
+            responses = await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the sibling batches before the snapshot is invalidated below
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            snapshot_cache.invalidate(self.base_url, table_id)
+        results = []
+        for response in responses:
+            if response.content:
+                results.extend(response.json().get("items", []))
+        return results
+
+    async def create_rows(self, table_id: str, rows: List[Dict]) -> List[Dict]:
+        return await self._send_batches(
+            "POST",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch/",
+            rows,
+            params={"user_field_names": "true"},
+            stage="create_batch"
+        )
+
+    async def update_rows(self, table_id: str, rows: List[Dict]) -> List[Dict]:
+        return await self._send_batches(
+            "PATCH",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch/",
+            rows,
+            params={"user_field_names": "true"},
+            stage="update_batch"
+        )
+
+    async def delete_rows(self, table_id: str, row_ids: List[int]) -> int:
+        await self._send_batches(
+            "POST",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch-delete/",
+            row_ids,
+            stage="delete_batch"
+        )
+        return len(row_ids)
+
+    async def export_data(self, request: ExportRequest) -> Dict[str, int]:
+        if request.key_fields:
+            return await self.sync_data(request)
+
+        rows = await self.read_rows(request.table_id)
+        deleted = await self.delete_rows(request.table_id, [row['id'] for row in rows])
+        await self.create_rows(request.table_id, request.data)
+        return {"deleted": deleted, "inserted": len(request.data)}
+
+    async def sync_data(self, request: ExportRequest) -> Dict[str, int]:
+        current = await self.read_rows(request.table_id)
+        with stage_metrics.timer("baserow", "plan_sync", len(request.data)):
+            plan = plan_sync(current, request.data, request.key_fields)
+
+        await self.create_rows(request.table_id, plan.inserts)
+        await self.update_rows(request.table_id, plan.updates)
+        await self.delete_rows(request.table_id, plan.deletes)
+        return plan.counts()
@@ -1,54 +1,423 @@
+import math
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import TYPE_CHECKING, Iterable, List, Dict, Iterator, Optional, Union
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    from .snapshot_cache import snapshot_cache
+except ImportError:
+    from snapshot_cache import snapshot_cache
+try:
+    from ..stage_metrics import stage_metrics
+except ImportError:
+    # The API puts backend/ itself on sys.path and imports this as database.*
+    from stage_metrics import stage_metrics
+
+# Baserow rejects batch requests with more than 200 items
+BASEROW_BATCH_LIMIT = 200
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# POST creates (or batch-deletes) rows, so it is only resent when the server can't have
+# applied it: rate limited, unavailable, or the connection never opened
+POST_RETRY_STATUS_CODES = (429, 503)
+
+def is_retryable(method: str, status_code: int) -> bool:
+    if method.upper() == "POST":
+        return status_code in POST_RETRY_STATUS_CODES
+    return status_code in RETRY_STATUS_CODES
+
+class BatchRetry(Retry):
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST":
+            return bool(self.total) and status_code in POST_RETRY_STATUS_CODES
+        return super().is_retry(method, status_code, has_retry_after)
+
 class ExportRequest(BaseModel):
     table_id: str
     data: List[Dict]
+    key_fields: Optional[List[str]] = None
+
+# ISO dates and datetimes as export_frame sends them ("2024-01-01T00:00:00") and as
+# Baserow returns them ("2024-01-01" for date fields, "2024-01-01T00:00:00Z" otherwise)
+_ISO_DATETIME = re.compile(
+    r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2}(?::\d{2})?)(?:\.\d+)?(Z|[+-]\d{2}:?\d{2})?)?$'
+)
+
+def _normalize_datetime(match):
+    # Dates stay dates; datetimes become naive UTC to the second, since naive values
+    # are UTC throughout (the report profiles store them that way)
+    date, time, offset = match.groups()
+    if time is None:
+        return date
+    value = datetime.fromisoformat(f"{date}T{time}")
+    if offset and offset != 'Z':
+        sign = -1 if offset[0] == '-' else 1
+        hours, minutes = int(offset[1:3]), int(offset[-2:])
+        value -= sign * timedelta(hours=hours, minutes=minutes)
+    return value.isoformat(timespec='seconds')
+
+def _normalize_value(value):
+    # Baserow returns numbers as decimal strings and select options as objects
+    if isinstance(value, dict) and 'value' in value:
+        value = value['value']
+    if value is None or value == '' or value != value:
+        return None
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    if isinstance(value, str):
+        match = _ISO_DATETIME.match(value.strip())
+        if match:
+            return _normalize_datetime(match)
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+def _key_value(value):
+    # Keys compare as text so "00123" and "123", or IDs past 2**53, stay distinct;
+    # only whole floats (pandas' NaN-widened ints) are folded back to their int form
+    if isinstance(value, dict) and 'value' in value:
+        value = value['value']
+    if value is None or value == '' or value != value:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _row_changed(current: Dict, row: Dict, fields: List[str]) -> bool:
+    for field in fields:
+        stored = _normalize_value(current.get(field))
+        sent = _normalize_value(row.get(field))
+        # A date field keeps only the day of the datetime it was sent
+        if stored is not None and sent is not None and len(stored) == 10 and _ISO_DATETIME.match(stored):
+            sent = sent[:10]
+        if stored != sent:
+            return True
+    return False
+
+def _json_column(column: "pd.Series") -> List:
+    # One column of a batch as JSON-safe Python values: NaN/NaT/NA/inf become None,
+    # numpy scalars become ints/floats/bools and timestamps ISO strings
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(object)
+    missing = column.isna().to_numpy()
+    if pd.api.types.is_float_dtype(column.dtype):
+        missing |= ~np.isfinite(column.to_numpy(dtype=float, na_value=np.nan))
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        values = [None if m else v.isoformat() for v, m in zip(column, missing)]
+    elif column.dtype == object:
+        values = [
+            None if m else v if type(v) is str else _json_scalar(v)
+            for v, m in zip(column.to_numpy(), missing)
+        ]
+    else:
+        # astype(object) unboxes numpy numbers and bools into their Python equivalents
+        values = column.astype(object).to_numpy()
+        values[missing] = None
+        values = values.tolist()
+    return values
+
+def _json_scalar(value):
+    import numpy as np
+
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def iter_record_batches(data: Union["pd.DataFrame", Iterable["pd.DataFrame"]],
+                        batch_size: int = BASEROW_BATCH_LIMIT) -> Iterator[List[Dict]]:
+    # Serializes a frame, or an iterator of frame chunks, one batch of row dicts at a time
+    import pandas as pd
+
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    pending = []
+    for chunk in chunks:
+        for start in range(0, len(chunk), batch_size):
+            part = chunk.iloc[start:start + batch_size]
+            columns = [_json_column(part[name]) for name in part.columns]
+            names = [str(name) for name in part.columns]
+            pending.extend(dict(zip(names, row)) for row in zip(*columns))
+            # Chunk sizes need not line up with batches; leftovers wait for the next chunk
+            while len(pending) >= batch_size:
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+class SyncPlan:
+    def __init__(self):
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "inserted": len(self.inserts),
+            "updated": len(self.updates),
+            "deleted": len(self.deletes),
+            "unchanged": self.unchanged
+        }
+
+def plan_sync(current_rows, data: List[Dict], key_fields: List[str]) -> SyncPlan:
+    # 'id' is Baserow's row id, never a data field to compare
+    fields = sorted({field for row in data for field in row} - {'id'})
+
+    def key_of(row):
+        return tuple(_key_value(row.get(field)) for field in key_fields)
+
+    incoming = {}
+    duplicates = 0
+    for row in data:
+        key = key_of(row)
+        if key in incoming:
+            duplicates += 1
+        else:
+            incoming[key] = row
+    if duplicates:
+        # Keeping one row per key would silently drop the others
+        raise ValueError(
+            f"{duplicates} of {len(data)} rows repeat a key on {key_fields}; "
+            f"choose key fields that identify every row, or export without them to replace the table"
+        )
+
+    plan = SyncPlan()
+    existing = {}
+    for row in current_rows:
+        key = key_of(row)
+        if key in existing or key not in incoming:
+            # Stale rows and duplicate keys both go
+            plan.deletes.append(row['id'])
+        else:
+            existing[key] = row
+
+    for key, row in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            plan.inserts.append(row)
+        elif _row_changed(current, row, fields):
+            # The target row's id wins over any id column in the data
+            plan.updates.append({**row, "id": current['id']})
+        else:
+            plan.unchanged += 1
+    return plan
 
 class BaserowConnector:
-    def __init__(self, base_url: str, api_token: str):
+    def __init__(self, base_url: str, api_token: str, batch_size: int = BASEROW_BATCH_LIMIT,
+                 timeout: float = 30, max_retries: int = 5, backoff_factor: float = 0.5,
+                 pool_size: int = 10):
         self.base_url = base_url.rstrip('/')
         self.api_token = api_token
         self.headers = {
             "Authorization": f"Token {api_token}",
             "Content-Type": "application/json"
         }
-    
-    def test_connection(self):
-        response = requests.get(
-            f"{self.base_url}/api/database/tables/", 
-            headers=self.headers
+        self.batch_size = max(1, min(batch_size, BASEROW_BATCH_LIMIT))
+        self.timeout = timeout
+        self.retries = 0
+
+        # One keep-alive session for every call; urllib3 handles the retries,
+        # backing off exponentially and honouring Retry-After on 429/503. POST is left
+        # out of allowed_methods, so read errors and timeouts never resend it
+        retry = BatchRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+            respect_retry_after_header=True,
+            raise_on_status=False
         )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        # urllib3 retries inside the adapter; its history is the only record of them
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None:
+            self.retries += len(retries.history)
         response.raise_for_status()
-        return response.json()
-    
-    def export_data(self, request: ExportRequest):
-        # First clear existing data
-        delete_url = f"{self.base_url}/api/database/rows/table/{request.table_id}/batch/"
-        rows = requests.get(
-            f"{self.base_url}/api/database/rows/table/{request.table_id}/?user_field_names=true", 
-            headers=self.headers
-        ).json()['results']
-        
-        if rows:
-            row_ids = [row['id'] for row in rows]
-            requests.delete(
-                delete_url,
-                json={"items": row_ids},
-                headers=self.headers
-            )
-        
-        # Add new data in batches
-        batch_url = f"{self.base_url}/api/database/rows/table/{request.table_id}/batch/"
-        batch_size = 100
-        for i in range(0, len(request.data), batch_size):
-            batch = request.data[i:i+batch_size]
-            payload = {
-                "items": [
-                    {"row": row, "user_field_names": True}
-                    for row in batch
-                ]
-            }
-            response = requests.post(batch_url, json=payload, headers=self.headers)
-            response.raise_for_status()
\ No newline at end of file
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def test_connection(self):
+        return self._request("GET", "/api/database/tables/").json()
+
+    def _fetch_page(self, table_id: str, page: int, page_size: int) -> Dict:
+        with stage_metrics.timer("baserow", "fetch_page") as timing:
+            data = self._request(
+                "GET",
+                f"/api/database/rows/table/{table_id}/",
+                params={"user_field_names": "true", "page": page, "size": page_size}
+            ).json()
+            timing.rows = len(data.get('results', []))
+        return data
+
+    def iter_pages(self, table_id: str, page_size: int = BASEROW_BATCH_LIMIT,
+                   workers: int = 4) -> Iterator[List[Dict]]:
+        page_size = max(1, min(page_size, BASEROW_BATCH_LIMIT))
+        first = self._fetch_page(table_id, 1, page_size)
+        yield first['results']
+        if not first.get('next'):
+            return
+
+        # The first page reports the row count, so the rest can be fetched in
+        # parallel; at most 2 * workers pages are held while yielding in order
+        last_page = max(2, math.ceil(first['count'] / page_size))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            next_page = 2
+            data = first
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < 2 * workers:
+                    pending.append(pool.submit(self._fetch_page, table_id, next_page, page_size))
+                    next_page += 1
+                data = pending.popleft().result()
+                yield data['results']
+
+        # Rows added while reading push the table past the counted pages
+        page = last_page
+        while data.get('next'):
+            page += 1
+            data = self._fetch_page(table_id, page, page_size)
+            yield data['results']
+
+    def iter_rows(self, table_id: str, page_size: int = BASEROW_BATCH_LIMIT,
+                  workers: int = 4) -> Iterator[Dict]:
+        for rows in self.iter_pages(table_id, page_size, workers):
+            yield from rows
+
+    def read_dataframe(self, table_id: str, page_size: int = BASEROW_BATCH_LIMIT,
+                       workers: int = 4) -> "pd.DataFrame":
+        import pandas as pd
+
+        frames = [
+            pd.DataFrame.from_records(rows)
+            for rows in self.iter_pages(table_id, page_size, workers)
+            if rows
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _batches(self, items: List, batch_size: Optional[int] = None):
+        batch_size = batch_size or self.batch_size
+        for i in range(0, len(items), batch_size):
+            yield items[i:i+batch_size]
+
+    def _send_batches(self, method: str, table_id: str, path: str, items: List,
+                      stage: str = "batch", **kwargs):
+        if not items:
+            return
+        self._send_batch_iter(method, table_id, path, self._batches(items), stage, **kwargs)
+
+    def _send_batch_iter(self, method: str, table_id: str, path: str, batches: Iterable[List],
+                         stage: str = "batch", **kwargs) -> int:
+        sent = 0
+        try:
+            for batch in batches:
+                with stage_metrics.timer("baserow", stage, len(batch)):
+                    self._request(method, path, json={"items": batch}, **kwargs)
+                sent += len(batch)
+        finally:
+            # Even a partial write leaves cached snapshots of the table stale
+            snapshot_cache.invalidate(self.base_url, table_id)
+        return sent
+
+    def create_rows(self, table_id: str, rows: List[Dict]) -> int:
+        self._send_batches(
+            "POST",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch/",
+            rows,
+            params={"user_field_names": "true"},
+            stage="create_batch"
+        )
+        return len(rows)
+
+    def update_rows(self, table_id: str, rows: List[Dict]) -> int:
+        self._send_batches(
+            "PATCH",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch/",
+            rows,
+            params={"user_field_names": "true"},
+            stage="update_batch"
+        )
+        return len(rows)
+
+    def delete_rows(self, table_id: str, row_ids: List[int]) -> int:
+        self._send_batches(
+            "POST",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch-delete/",
+            row_ids,
+            stage="delete_batch"
+        )
+        return len(row_ids)
+
+    def export_data(self, request: ExportRequest) -> Dict[str, int]:
+        if request.key_fields:
+            return self.sync_data(request)
+
+        # Replace the table contents: clear existing data, then add the new rows
+        row_ids = [row['id'] for row in self.iter_rows(request.table_id)]
+        return {
+            "deleted": self.delete_rows(request.table_id, row_ids),
+            "inserted": self.create_rows(request.table_id, request.data)
+        }
+
+    def export_frame(self, table_id: str, data: Union["pd.DataFrame", Iterable["pd.DataFrame"]],
+                     key_fields: Optional[List[str]] = None) -> Dict[str, int]:
+        # Like export_data, but rows are serialized batch by batch from a DataFrame
+        # or chunk iterator instead of arriving as one list of dicts
+        batches = iter_record_batches(data, self.batch_size)
+        if key_fields:
+            # Planning a sync compares every incoming row, so those rows are held regardless
+            rows = [row for batch in batches for row in batch]
+            return self._sync_rows(table_id, rows, key_fields)
+
+        row_ids = [row['id'] for row in self.iter_rows(table_id)]
+        deleted = self.delete_rows(table_id, row_ids)
+        inserted = self._send_batch_iter(
+            "POST",
+            table_id,
+            f"/api/database/rows/table/{table_id}/batch/",
+            batches,
+            params={"user_field_names": "true"},
+            stage="create_batch"
+        )
+        return {"deleted": deleted, "inserted": inserted}
+
+    def sync_data(self, request: ExportRequest) -> Dict[str, int]:
+        return self._sync_rows(request.table_id, request.data, request.key_fields)
+
+    def _sync_rows(self, table_id: str, data: List[Dict], key_fields: List[str]) -> Dict[str, int]:
+        # Current rows stream straight into the plan, so this includes their fetch_page time
+        with stage_metrics.timer("baserow", "plan_sync", len(data)):
+            plan = plan_sync(self.iter_rows(table_id), data, key_fields)
+
+        # Inserts land first so readers never see the table emptier than it ends up
+        self.create_rows(table_id, plan.inserts)
+        self.update_rows(table_id, plan.updates)
+        self.delete_rows(table_id, plan.deletes)
+        return plan.counts()
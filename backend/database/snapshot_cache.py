@@ -0,0 +1,47 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+class TableSnapshotCache:
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, "pd.DataFrame"]] = {}
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, table_id: str, loader: Callable[[], "pd.DataFrame"]) -> "pd.DataFrame":
+        key = (base_url, str(table_id))
+        with self._lock:
+            entry = self._snapshots.get(key)
+            version = self._versions.get(key, 0)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        df = loader()
+        with self._lock:
+            # A write that landed while loading makes this snapshot stale already
+            if self._versions.get(key, 0) == version:
+                self._snapshots[key] = (time.monotonic(), df)
+        return df
+
+    def version(self, base_url: str, table_id: str) -> int:
+        with self._lock:
+            return self._versions.get((base_url, str(table_id)), 0)
+
+    def invalidate(self, base_url: str, table_id: str):
+        key = (base_url, str(table_id))
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._snapshots):
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._snapshots.clear()
+
+# Shared by every connector and query processor in the process
+snapshot_cache = TableSnapshotCache()
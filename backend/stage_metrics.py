@@ -0,0 +1,113 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+class StageTiming:
+    def __init__(self, rows: int = 0):
+        self.rows = rows
+
+class StageMetrics:
+    # Process-wide durations, row counts and cache lookups per (component, stage)
+    def __init__(self):
+        self._stages: Dict[tuple, List[float]] = {}
+        self._caches: Dict[tuple, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, component: str, stage: str, seconds: float, rows: int = 0, calls: int = 1):
+        with self._lock:
+            entry = self._stages.setdefault((component, stage), [0, 0.0, 0])
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] += rows
+
+    @contextmanager
+    def timer(self, component: str, stage: str, rows: int = 0):
+        # Row counts known only afterwards can be set on the yielded timing
+        timing = StageTiming(rows)
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            self.observe(component, stage, time.perf_counter() - start, timing.rows)
+
+    def record_cache(self, component: str, cache: str, hits: int = 0, misses: int = 0):
+        with self._lock:
+            entry = self._caches.setdefault((component, cache), [0, 0])
+            entry[0] += hits
+            entry[1] += misses
+
+    def merge(self, component: str, report: Dict):
+        # report as returned by SKUMapper.drain_stage_times(), possibly from a worker process
+        for stage, (calls, seconds, rows) in report.get('stages', {}).items():
+            self.observe(component, stage, seconds, rows, calls)
+        for cache, (hits, misses) in report.get('caches', {}).items():
+            if hits or misses:
+                self.record_cache(component, cache, hits, misses)
+
+    def stages(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._stages.items())
+        return [
+            {
+                'component': component,
+                'stage': stage,
+                'calls': calls,
+                'seconds': seconds,
+                'rows': rows,
+                'rows_per_second': rows / seconds if rows and seconds else None
+            }
+            for (component, stage), (calls, seconds, rows) in items
+        ]
+
+    def caches(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._caches.items())
+        return [
+            {
+                'component': component,
+                'cache': cache,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+            }
+            for (component, cache), (hits, misses) in items
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._caches.clear()
+
+    def render_prometheus(self) -> str:
+        stages = self.stages()
+        lines = []
+        for name, field, help_text in (
+            ('warehouse_stage_seconds_total', 'seconds', 'Time spent in each processing stage.'),
+            ('warehouse_stage_calls_total', 'calls', 'Times each processing stage ran.'),
+            ('warehouse_stage_rows_total', 'rows', 'Rows handled by each processing stage.'),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [
+                f"{name}{_labels(component=s['component'], stage=s['stage'])} {s[field]}"
+                for s in stages
+            ]
+
+        lines += [
+            "# HELP warehouse_cache_lookups_total Cache lookups by result.",
+            "# TYPE warehouse_cache_lookups_total counter",
+        ]
+        for c in self.caches():
+            for result, field in (('hit', 'hits'), ('miss', 'misses')):
+                lookup = _labels(component=c['component'], cache=c['cache'], result=result)
+                lines.append(f"warehouse_cache_lookups_total{lookup} {c[field]}")
+        return "\n".join(lines) + "\n"
+
+def _labels(**values) -> str:
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in values.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+stage_metrics = StageMetrics()
@@ -0,0 +1,155 @@
+"""Export load test against the local Baserow stand-in (or any Baserow URL).
+
+    python benchmarks/baserow_load_test.py --sizes 1000 10000 50000 --latency 0.01 --rate-limit 100 --error-rate 0.02
+
+Each size runs an export into an empty table and then a second one over it:
+a full replace, or a keyed sync with --key-fields (which also changes a
+tenth of the rows). Reports rows/s, client retries and the server's 429/5xx
+counts, and checks the final row count.
+
+Batch creates and deletes are POSTs, which the connectors only resend on 429/503:
+a 500 or 502 may come after the rows were written. With --error-rate such an
+export stops, and is reported as a write failure rather than a test failure.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_baserow import FakeBaserow, serve
+from backend.database.database_connector import BaserowConnector, ExportRequest
+
+def make_rows(count, revision=0):
+    return [
+        {
+            "row_key": f"K{i:08d}",
+            "sku": f"SKU_{i % 5000:05d}",
+            "quantity": (i % 7) + 1,
+            "price": round(5 + (i % 300) * 0.5 + (revision if i % 10 == 0 else 0), 2),
+        }
+        for i in range(count)
+    ]
+
+def run_export(url, token, connector_kind, request, args):
+    if connector_kind == "async":
+        from backend.database.async_connector import AsyncBaserowConnector
+
+        async def go():
+            connector = AsyncBaserowConnector(
+                url, token, batch_size=args.batch_size, concurrency=args.concurrency,
+                max_retries=args.max_retries, backoff_factor=args.backoff
+            )
+            try:
+                return await connector.export_data(request), connector.retries
+            finally:
+                await connector.aclose()
+        return asyncio.run(go())
+
+    connector = BaserowConnector(
+        url, token, batch_size=args.batch_size, max_retries=args.max_retries,
+        backoff_factor=args.backoff, pool_size=args.concurrency
+    )
+    try:
+        return connector.export_data(request), connector.retries
+    finally:
+        connector.close()
+
+def write_failure(error):
+    # "create 500" for an export stopped by a batch POST the connector would not resend
+    request = getattr(error, "request", None)
+    response = getattr(error, "response", None)
+    if request is None or response is None or request.method != "POST":
+        return None
+    kind = "delete" if "/batch-delete/" in str(request.url) else "create"
+    return f"{kind} {response.status_code}"
+
+def server_stats(url):
+    response = requests.get(f"{url}/_stats", timeout=10)
+    return response.json() if response.ok else {}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="existing server; default starts one in-process")
+    parser.add_argument("--token", default="load-test")
+    parser.add_argument("--table-id", default="1")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--connector", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--key-fields", nargs="*", default=None, help="e.g. row_key; omitted = full replace")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=8)
+    parser.add_argument("--backoff", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        backend = FakeBaserow(args.latency, args.jitter, args.rate_limit, args.error_rate, args.seed)
+        server = serve(backend)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Target {url}")
+    print(f"{'connector':<10}{'rows':>9}{'pass':>8}{'seconds':>10}{'rows/s':>12}"
+          f"{'retries':>9}{'429s':>7}{'5xx':>6}{'POST 5xx':>10}  result")
+
+    kinds = ["sync", "async"] if args.connector == "both" else [args.connector]
+    failed = False
+    write_failures = []
+    try:
+        for kind in kinds:
+            for size in args.sizes:
+                if server is not None:
+                    requests.post(f"{url}/_reset", timeout=10)
+                for label, revision in (("initial", 0), ("repeat", 1)):
+                    request = ExportRequest(
+                        table_id=args.table_id, data=make_rows(size, revision), key_fields=args.key_fields
+                    )
+                    before = server_stats(url)
+                    start = time.perf_counter()
+                    try:
+                        counts, retries = run_export(url, args.token, kind, request, args)
+                        result = ", ".join(f"{k}={v}" for k, v in counts.items())
+                    except Exception as e:
+                        counts, retries = None, 0
+                        # httpx appends a documentation link on a second line
+                        message = str(e).splitlines()[0]
+                        stopped = write_failure(e)
+                        if stopped:
+                            result = f"STOPPED by {stopped}: {message}"
+                            write_failures.append(f"{kind} {size} {label}: {stopped}")
+                        else:
+                            result = f"FAILED: {message}"
+                            failed = True
+                    seconds = time.perf_counter() - start
+                    after = server_stats(url)
+                    throttled = after.get("throttled", 0) - before.get("throttled", 0)
+                    errors = after.get("server_errors", 0) - before.get("server_errors", 0)
+                    post_errors = after.get("post_errors", 0) - before.get("post_errors", 0)
+                    stored = after.get("tables", {}).get(str(args.table_id))
+                    if counts is not None and stored is not None and stored != size:
+                        result += f"  ROW COUNT {stored} != {size}"
+                        failed = True
+                    print(f"{kind:<10}{size:>9}{label:>8}{seconds:>10.2f}{size / seconds:>12,.0f}"
+                          f"{retries:>9}{throttled:>7}{errors:>6}{post_errors:>10}  {result}")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    if write_failures:
+        print(f"{len(write_failures)} export(s) stopped by batch POSTs that are not resent: "
+              + "; ".join(write_failures))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
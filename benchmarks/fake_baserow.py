@@ -0,0 +1,272 @@
+"""Local Baserow stand-in for export throughput and resilience testing.
+
+Serves the endpoints BaserowConnector uses (table list, paginated row list,
+batch create / update / delete) from memory, with optional latency, a
+token-bucket rate limit answered with 429 + Retry-After, and random 5xx.
+
+    python benchmarks/fake_baserow.py --port 8765 --latency 0.02 --rate-limit 50 --error-rate 0.02
+
+GET /_stats returns request and fault counters; POST /_reset clears tables and counters.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BATCH_LIMIT = 200
+ROWS_PATH = re.compile(r"^/api/database/rows/table/(\d+)/(batch/|batch-delete/)?$")
+
+class FakeBaserow:
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=None, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.next_ids = {}
+        self.stats = Counter()
+        self._tokens = float(rate_limit or 0)
+        self._refilled = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.next_ids.clear()
+            self.stats.clear()
+
+    def table(self, table_id):
+        # Tables spring into existence on first use, like a freshly created empty table
+        if table_id not in self.tables:
+            self.tables[table_id] = {}
+            self.next_ids[table_id] = 1
+        return self.tables[table_id]
+
+    def throttle(self):
+        # Token bucket with a one-second burst; returns the wait before a token is free
+        if not self.rate_limit:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate_limit
+
+    def fail(self):
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                return self.random.choice((500, 502, 503))
+        return None
+
+    def list_rows(self, table_id, page, size):
+        with self.lock:
+            rows = list(self.table(table_id).values())
+        start = (page - 1) * size
+        if page < 1 or (start >= len(rows) and page > 1):
+            return 404, {"error": "ERROR_INVALID_PAGE", "detail": "Invalid page."}
+        more = start + size < len(rows)
+        return 200, {
+            "count": len(rows),
+            "next": f"?page={page + 1}&size={size}" if more else None,
+            "previous": f"?page={page - 1}&size={size}" if page > 1 else None,
+            "results": rows[start:start + size],
+        }
+
+    def create_rows(self, table_id, items):
+        created = []
+        with self.lock:
+            table = self.table(table_id)
+            for item in items:
+                row_id = self.next_ids[table_id]
+                self.next_ids[table_id] += 1
+                table[row_id] = {"id": row_id, "order": str(row_id), **item}
+                created.append(table[row_id])
+            self.stats["rows_created"] += len(created)
+        return 200, {"items": created}
+
+    def update_rows(self, table_id, items):
+        with self.lock:
+            table = self.table(table_id)
+            missing = [item.get("id") for item in items if item.get("id") not in table]
+            if missing:
+                return 404, {"error": "ERROR_ROW_DOES_NOT_EXIST", "detail": f"The rows {missing} do not exist."}
+            for item in items:
+                table[item["id"]].update(item)
+            self.stats["rows_updated"] += len(items)
+            return 200, {"items": [table[item["id"]] for item in items]}
+
+    def delete_rows(self, table_id, row_ids):
+        with self.lock:
+            table = self.table(table_id)
+            missing = [row_id for row_id in row_ids if row_id not in table]
+            if missing:
+                return 404, {"error": "ERROR_ROW_DOES_NOT_EXIST", "detail": f"The rows {missing} do not exist."}
+            for row_id in row_ids:
+                del table[row_id]
+            self.stats["rows_deleted"] += len(row_ids)
+        return 204, None
+
+    def snapshot_stats(self):
+        with self.lock:
+            return {
+                **self.stats,
+                "tables": {str(table_id): len(rows) for table_id, rows in self.tables.items()},
+            }
+
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload=None, headers=None):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def _handle(self, method):
+            # Read the body before any early answer so keep-alive connections stay in sync
+            try:
+                body = self._body()
+            except ValueError:
+                return self._send(400, {"error": "ERROR_REQUEST_BODY_VALIDATION", "detail": "Invalid JSON."})
+            url = urlparse(self.path)
+            with backend.lock:
+                backend.stats["requests"] += 1
+
+            if url.path == "/_stats":
+                return self._send(200, backend.snapshot_stats())
+            if url.path == "/_reset" and method == "POST":
+                backend.reset()
+                return self._send(204)
+
+            if not (self.headers.get("Authorization") or "").startswith("Token "):
+                return self._send(401, {"error": "ERROR_INVALID_TOKEN", "detail": "Token is invalid."})
+
+            wait = backend.throttle()
+            if wait is not None:
+                with backend.lock:
+                    backend.stats["throttled"] += 1
+                # urllib3 only accepts whole seconds in Retry-After
+                return self._send(429, {"detail": "Request was throttled."},
+                                  {"Retry-After": str(math.ceil(wait))})
+
+            if backend.latency or backend.jitter:
+                time.sleep(backend.latency + backend.random.uniform(0, backend.jitter))
+
+            status = backend.fail()
+            if status is not None:
+                with backend.lock:
+                    backend.stats["server_errors"] += 1
+                    if method == "POST":
+                        # Creates and batch deletes; the clients only resend these on 503
+                        backend.stats["post_errors"] += 1
+                return self._send(status, {"error": "ERROR_INJECTED", "detail": "Injected failure."})
+
+            status, payload = self._route(method, url, body)
+            self._send(status, payload)
+
+        def _route(self, method, url, body):
+            if url.path in ("/api/database/tables/", "/api/database/tables/all-tables/") and method == "GET":
+                with backend.lock:
+                    return 200, [
+                        {"id": table_id, "name": f"Table {table_id}", "order": table_id, "database_id": 1}
+                        for table_id in sorted(backend.tables)
+                    ]
+
+            match = ROWS_PATH.match(url.path)
+            if not match:
+                return 404, {"error": "ERROR_NOT_FOUND", "detail": "Not found."}
+            table_id, action = int(match.group(1)), match.group(2)
+
+            if action is None and method == "GET":
+                query = parse_qs(url.query)
+                try:
+                    page = int(query.get("page", ["1"])[0])
+                    size = int(query.get("size", ["100"])[0])
+                except ValueError:
+                    return 400, {"error": "ERROR_QUERY_PARAMETER_VALIDATION", "detail": "Invalid page or size."}
+                if not 1 <= size <= BATCH_LIMIT:
+                    return 400, {"error": "ERROR_QUERY_PARAMETER_VALIDATION", "detail": "Invalid size."}
+                return backend.list_rows(table_id, page, size)
+
+            items = (body or {}).get("items")
+            if action is None or not isinstance(items, list):
+                return 400, {"error": "ERROR_REQUEST_BODY_VALIDATION", "detail": "Expected an items list."}
+            if not 1 <= len(items) <= BATCH_LIMIT:
+                return 400, {"error": "ERROR_REQUEST_BODY_VALIDATION",
+                             "detail": f"Ensure this field has between 1 and {BATCH_LIMIT} elements."}
+            if action == "batch/" and method == "POST":
+                return backend.create_rows(table_id, items)
+            if action == "batch/" and method == "PATCH":
+                return backend.update_rows(table_id, items)
+            if action == "batch-delete/" and method == "POST":
+                return backend.delete_rows(table_id, items)
+            return 405, {"error": "ERROR_METHOD_NOT_ALLOWED", "detail": "Method not allowed."}
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+def serve(backend, host="127.0.0.1", port=0):
+    # Port 0 picks a free port; the bound one is server.server_address[1]
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, uniform")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second before 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 5xx")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    backend = FakeBaserow(args.latency, args.jitter, args.rate_limit, args.error_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    server.daemon_threads = True
+    print(f"Fake Baserow on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
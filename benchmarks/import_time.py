@@ -0,0 +1,77 @@
+"""Cold-start guard: time fresh-interpreter imports of each entry point.
+
+Fails (exit code 1) when an import exceeds its budget or eagerly loads a
+dependency that is supposed to be deferred to first use.
+
+    python benchmarks/import_time.py [--repeat 5] [--scale 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# name -> (sys.path entry relative to ROOT, module, budget in seconds)
+TARGETS = {
+    "api": ("backend", "api.main", 1.5),
+    "query_processor": (".", "backend.ai_layer.query_processor", 1.5),
+    "sku_mapper": ("frontend/gui_app", "sku_mapper", 1.5),
+    "data_processor": ("frontend/web_app", "data_processor", 2.0),
+}
+
+# Modules that must only load on first use
+DEFERRED = ("langchain", "langchain_openai", "langchain_community", "openai", "plotly", "thefuzz")
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted({{m.split('.')[0] for m in sys.modules}} & set({deferred!r}))
+print(json.dumps({{"seconds": elapsed, "deferred_loaded": loaded}}))
+"""
+
+def measure(path, module, repeat):
+    code = PROBE.format(path=os.path.join(ROOT, path), module=module, deferred=DEFERRED)
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(r["seconds"] for r in runs), runs[-1]["deferred_loaded"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI boxes)")
+    parser.add_argument("targets", nargs="*", default=list(TARGETS))
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'target':<18}{'median s':>10}{'budget s':>10}  status")
+    for name in args.targets:
+        path, module, budget = TARGETS[name]
+        budget *= args.scale
+        try:
+            seconds, deferred = measure(path, module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<18}{'-':>10}{budget:>10.2f}  IMPORT ERROR: {e.stderr.strip().splitlines()[-1]}")
+            failed = True
+            continue
+        status = "ok"
+        if seconds > budget:
+            status = "OVER BUDGET"
+        if deferred:
+            status = f"eagerly loads {', '.join(deferred)}"
+        failed |= status != "ok"
+        print(f"{name:<18}{seconds:>10.3f}{budget:>10.2f}  {status}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
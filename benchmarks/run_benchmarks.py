@@ -0,0 +1,211 @@
+"""Throughput and peak-memory benchmarks for mapping, processing and export.
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 [--label v2] [--compare benchmarks/results/v1.json]
+
+Each stage is timed once without tracing and then, unless --skip-memory is
+given, re-run under tracemalloc for its peak allocation. Results are written
+to benchmarks/results/<label>.json so two versions can be compared.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SANDBOX = tempfile.mkdtemp(prefix="wms-bench-")
+# The mapper and parse caches live under ~; keep the benchmark from reusing (or polluting) real ones
+os.environ["HOME"] = SANDBOX
+
+sys.path.insert(0, os.path.join(ROOT, "frontend", "web_app"))
+sys.path.insert(0, os.path.join(ROOT, "frontend", "gui_app"))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from requests.adapters import BaseAdapter
+
+from synthetic_data import generate_master, generate_sales
+from sku_mapper import SKUMapper
+from data_processor import process_sales_data
+from backend.database.database_connector import BaserowConnector, ExportRequest
+
+# Mapped share each generated SKU kind should reach; fuzzy edits stay above the cutoff
+EXPECTED_MAPPED_RATE = {"exact": 1.0, "combo": 1.0, "fuzzy": 1.0, "unmapped": 0.0}
+MAPPED_RATE_TOLERANCE = 0.01
+
+class NullAdapter(BaseAdapter):
+    # Answers every Baserow call locally so export_data measures client-side cost only
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    def send(self, request, **kwargs):
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"count": 0, "next": null, "results": [], "items": []}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+def measure(fn, rows, with_memory, setup=None):
+    # setup() runs before each timed call, outside the timer, and its result is passed to fn
+    arg = setup() if setup else None
+    start = time.perf_counter()
+    fn(arg) if setup else fn()
+    seconds = time.perf_counter() - start
+    result = {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+    }
+    if with_memory:
+        arg = setup() if setup else None
+        tracemalloc.start()
+        fn(arg) if setup else fn()
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+        tracemalloc.stop()
+    return result
+
+def bench_size(rows, master_rows, workdir, with_memory):
+    master = generate_master(master_rows, seed=rows)
+    sales, combos, expected = generate_sales(master, rows, seed=rows + 1)
+    master_path = os.path.join(workdir, f"master_{master_rows}.csv")
+    sales_path = os.path.join(workdir, f"sales_{rows}.csv")
+    master.to_csv(master_path, index=False)
+    sales.to_csv(sales_path, index=False)
+
+    def fresh_mapper():
+        mapper = SKUMapper()
+        mapper.load_master(master_path)
+        mapper.add_combo_products((combo.split("+"), msku) for combo, msku in combos.items())
+        return mapper
+
+    results = {}
+    results["load_master"] = measure(lambda: SKUMapper().load_master(master_path), master_rows, with_memory)
+
+    sample = sales["item_sku"].iloc[:min(rows, 5000)].tolist()
+    def auto_map(mapper):
+        for sku in sample:
+            mapper.auto_map(sku)
+    results["auto_map"] = measure(auto_map, len(sample), with_memory, setup=fresh_mapper)
+
+    results["process_file"] = measure(
+        lambda mapper: mapper.process_file(sales_path), rows, with_memory, setup=fresh_mapper
+    )
+    results["process_sales_data_cold"] = measure(
+        lambda: process_sales_data(master_path, [sales_path], "Other"), rows, False
+    )
+    results["process_sales_data_warm"] = measure(
+        lambda: process_sales_data(master_path, [sales_path], "Other"), rows, with_memory
+    )
+
+    records = sales.to_dict(orient="records")
+    def export():
+        connector = BaserowConnector("http://baserow.invalid", "token")
+        adapter = NullAdapter()
+        connector.session.mount("http://", adapter)
+        connector.export_data(ExportRequest(table_id="1", data=records))
+    results["export_data"] = measure(export, rows, with_memory)
+
+    mapped = fresh_mapper().process_file(sales_path)
+    results["unmapped_rate"] = round(float(mapped["MSKU"].isna().mean()), 4)
+    # Share of rows mapped per generated kind: every exact, combo and fuzzy SKU should map
+    rates = mapped["MSKU"].notna().groupby(expected.to_numpy()).mean()
+    results["mapped_rate"] = {kind: round(float(rate), 4) for kind, rate in rates.items()}
+    return results
+
+def mapping_problems(mapped_rate):
+    problems = []
+    for kind, rate in mapped_rate.items():
+        wanted = EXPECTED_MAPPED_RATE.get(kind)
+        if wanted is not None and abs(rate - wanted) > MAPPED_RATE_TOLERANCE:
+            problems.append(f"{kind} rows mapped at {rate:.2%}, expected {wanted:.0%}")
+    return problems
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nvs {baseline_path} ({baseline.get('revision')})")
+    for size, stages in current["results"].items():
+        for stage, now in stages.items():
+            before = baseline["results"].get(size, {}).get(stage)
+            if not isinstance(now, dict) or not isinstance(before, dict) or "seconds" not in now:
+                continue
+            ratio = now["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"  {size:>8} {stage:<26} {before['seconds']:>9.3f}s -> {now['seconds']:>9.3f}s  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append((size, stage))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--master-ratio", type=float, default=0.2, help="master rows per sales row")
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--skip-memory", action="store_true")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown ratio flagged as regression")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {},
+    }
+    mapping_failed = False
+    for rows in args.sizes:
+        master_rows = max(100, int(rows * args.master_ratio))
+        print(f"== {rows} sales rows / {master_rows} master rows")
+        stages = bench_size(rows, master_rows, SANDBOX, not args.skip_memory)
+        report["results"][str(rows)] = stages
+        for stage, result in stages.items():
+            if stage == "mapped_rate":
+                print(f"  {stage:<26} " + ", ".join(f"{kind} {rate:.2%}" for kind, rate in result.items()))
+                problems = mapping_problems(result)
+                for problem in problems:
+                    print(f"  MAPPING CHECK FAILED: {problem}")
+                mapping_failed = mapping_failed or bool(problems)
+            elif isinstance(result, dict):
+                peak = f"{result['peak_mb']:>9.1f} MB" if "peak_mb" in result else ""
+                print(f"  {stage:<26} {result['seconds']:>9.3f}s {result['rows_per_second'] or 0:>12,.0f} rows/s {peak}")
+            else:
+                print(f"  {stage:<26} {result}")
+
+    out_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, f"{args.label or revision or 'latest'}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nWrote {out_path}")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+    if mapping_failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Synthetic master SKU tables and marketplace sales reports.
+
+    python benchmarks/synthetic_data.py --rows 100000 --master-rows 50000 --out-dir data/synthetic
+"""
+import argparse
+import json
+import os
+import string
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["TOY", "CSTE", "BAG", "LAMP", "MUG", "TEE", "CAP", "SOCK"]
+VARIANTS = ["RED", "BLU", "GRN", "BLK", "WHT", "S", "M", "L", "XL", "2PK", "3PK"]
+FULFILLMENT_CENTERS = ["TLCQ", "BLR7", "DEL4", "BOM5", "MAA4", "HYD8"]
+ALPHABET = np.array(list(string.ascii_uppercase + string.digits))
+
+def generate_master(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = rng.choice(CATEGORIES, rows)
+    variants = rng.choice(VARIANTS, rows)
+    products = max(1, rows // 4)
+    product_ids = rng.integers(0, products, rows)
+    # Row number keeps every SKU unique; several SKUs share one master SKU
+    skus = [f"{c}_{p:06d}_{v}_{i:07d}" for i, (c, p, v) in enumerate(zip(categories, product_ids, variants))]
+    mskus = [f"{c}_{p:06d}" for c, p in zip(categories, product_ids)]
+    return pd.DataFrame({"sku": skus, "master_sku": mskus})
+
+def _fuzz_sku(sku, rng):
+    # Small edits that stay above the 80 partial_ratio cutoff
+    edit = rng.integers(0, 3)
+    pos = int(rng.integers(1, len(sku) - 1))
+    if edit == 0:
+        return sku[:pos] + sku[pos + 1:]
+    if edit == 1:
+        return sku[:pos] + str(rng.choice(ALPHABET)) + sku[pos + 1:]
+    return sku + "-" + "".join(rng.choice(ALPHABET, 2))
+
+def generate_sales(master, rows, exact_rate=0.85, combo_rate=0.03, fuzzy_rate=0.07,
+                   unmapped_rate=0.05, seed=1, start_date="2025-01-01", days=365):
+    rates = np.array([exact_rate, combo_rate, fuzzy_rate, unmapped_rate], dtype=float)
+    rates = rates / rates.sum()
+    rng = np.random.default_rng(seed)
+    kinds = rng.choice(4, rows, p=rates)
+    master_skus = master["sku"].to_numpy()
+
+    combos = {}
+    combo_pool = []
+    for i in range(max(1, min(1000, len(master_skus) // 2))):
+        parts = sorted(rng.choice(master_skus, 2, replace=False).tolist())
+        combos["+".join(parts)] = f"COMBO_{i:05d}"
+        combo_pool.append("+".join(parts))
+
+    picks = rng.choice(master_skus, rows)
+    skus = np.empty(rows, dtype=object)
+    for i, kind in enumerate(kinds):
+        if kind == 0:
+            skus[i] = picks[i].lower() if rng.random() < 0.1 else picks[i]
+        elif kind == 1:
+            skus[i] = combo_pool[rng.integers(0, len(combo_pool))]
+        elif kind == 2:
+            skus[i] = _fuzz_sku(picks[i], rng)
+        else:
+            skus[i] = "UNK-" + "".join(rng.choice(ALPHABET, 9))
+
+    order_count = max(1, int(rows * 0.7))
+    order_numbers = rng.integers(0, order_count, rows)
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(rng.integers(0, days, rows), unit="D")
+    sales = pd.DataFrame({
+        "order_id": [f"ORD-{n:09d}" for n in order_numbers],
+        "order_date": dates.strftime("%Y-%m-%d"),
+        "item_sku": skus,
+        "quantity": rng.integers(1, 5, rows),
+        "price": np.round(rng.uniform(2, 150, rows), 2),
+        "fulfillment_center": rng.choice(FULFILLMENT_CENTERS, rows),
+    })
+    expected = pd.Series(np.array(["exact", "combo", "fuzzy", "unmapped"])[kinds], name="kind")
+    return sales, combos, expected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--master-rows", type=int, default=None)
+    parser.add_argument("--exact-rate", type=float, default=0.85)
+    parser.add_argument("--combo-rate", type=float, default=0.03)
+    parser.add_argument("--fuzzy-rate", type=float, default=0.07)
+    parser.add_argument("--unmapped-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--out-dir", default="data/synthetic")
+    args = parser.parse_args()
+
+    master_rows = args.master_rows or max(100, args.rows // 5)
+    master = generate_master(master_rows, seed=args.seed)
+    sales, combos, _ = generate_sales(
+        master, args.rows, args.exact_rate, args.combo_rate, args.fuzzy_rate,
+        args.unmapped_rate, seed=args.seed + 1
+    )
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    master_path = os.path.join(args.out_dir, f"master_{master_rows}.{args.format}")
+    sales_path = os.path.join(args.out_dir, f"sales_{args.rows}.{args.format}")
+    if args.format == "xlsx":
+        master.to_excel(master_path, index=False)
+        sales.to_excel(sales_path, index=False)
+    else:
+        master.to_csv(master_path, index=False)
+        sales.to_csv(sales_path, index=False)
+    with open(os.path.join(args.out_dir, "combos.json"), "w") as f:
+        json.dump(combos, f, indent=1)
+    print(f"Wrote {master_path}, {sales_path} and {len(combos)} combos")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,51 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from sku_mapper import SKUMapper
+from mapping_cache import DEFAULT_CACHE_PATH
+from file_cache import ParsedFileCache
+from mapping_store import MappingStore
+from results_model import ResultsModel
 import pandas as pd
 import logging
 import os
+import queue
+import threading
+
+# Rows mapped between progress updates and cancel checks
+CHUNK_ROWS = 20000
+
+def estimate_rows(file_path):
+    # Only drives the progress bar, so a line count is close enough for CSV
+    try:
+        if file_path.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            workbook = load_workbook(file_path, read_only=True)
+            try:
+                rows = workbook.worksheets[0].max_row
+            finally:
+                workbook.close()
+            return rows - 1 if rows else None
+        with open(file_path, 'rb') as f:
+            return max(0, sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b'')) - 1)
+    except Exception:
+        return None
 
 class MappingApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("SKU Mapping Tool")
         self.geometry("900x700")
-        self.mapper = SKUMapper()
+        self.mapper = SKUMapper(cache_path=DEFAULT_CACHE_PATH, file_cache=ParsedFileCache(), store=MappingStore())
         self.processed_data = None
+        self.results = None
+        self.job = None
+        self.total_rows = None
         self._setup_ui()
         
+        # The last master loaded is kept in the mapping store, so it needn't be picked again
+        if self.mapper.load_from_store():
+            self.master_path.set(self.mapper.store.master_source() or "(saved mappings)")
+        
     def _setup_ui(self):
         # Configure styles
         style = ttk.Style()
@@ -52,30 +84,57 @@ class MappingApp(tk.Tk):
         )
         marketplace_combo.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
         
-        # Process button
-        ttk.Button(file_frame, text="Process Data", command=self.process_data).grid(row=3, column=1, pady=10)
+        # Process / cancel buttons and progress
+        self.process_btn = ttk.Button(file_frame, text="Process Data", command=self.process_data)
+        self.process_btn.grid(row=3, column=1, pady=10, sticky=tk.W)
+        self.cancel_btn = ttk.Button(file_frame, text="Cancel", command=self.cancel_processing, state=tk.DISABLED)
+        self.cancel_btn.grid(row=3, column=2, pady=10)
+        self.progress = ttk.Progressbar(file_frame, mode="determinate", length=400)
+        self.progress.grid(row=4, column=1, sticky=tk.W, padx=5)
+        self.progress_label = ttk.Label(file_frame, text="")
+        self.progress_label.grid(row=4, column=2, sticky=tk.W, padx=5)
         
         # Results table
         table_frame = ttk.LabelFrame(main_frame, text="Mapping Results")
         table_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
+        # Filter and paging controls; only the current page is ever inserted into the tree
+        nav_frame = ttk.Frame(table_frame, padding=0)
+        nav_frame.grid(row=0, column=0, columnspan=2, sticky=tk.EW, pady=(0, 5))
+        ttk.Label(nav_frame, text="Show:").pack(side=tk.LEFT)
+        self.result_filter = tk.StringVar(value="All")
+        filter_combo = ttk.Combobox(
+            nav_frame,
+            textvariable=self.result_filter,
+            values=ResultsModel.FILTERS,
+            state="readonly",
+            width=10
+        )
+        filter_combo.pack(side=tk.LEFT, padx=5)
+        filter_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        ttk.Button(nav_frame, text="Next >", command=lambda: self.show_page(1)).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(nav_frame, text="< Prev", command=lambda: self.show_page(-1)).pack(side=tk.RIGHT, padx=2)
+        self.page_label = ttk.Label(nav_frame, text="")
+        self.page_label.pack(side=tk.RIGHT, padx=10)
+        
         # Create treeview with scrollbars
-        self.tree = ttk.Treeview(table_frame, columns=("Input SKU", "Mapped MSKU", "Status"), show="headings")
-        self.tree.heading("Input SKU", text="Input SKU")
-        self.tree.heading("Mapped MSKU", text="Mapped MSKU")
-        self.tree.heading("Status", text="Status")
+        self.tree = ttk.Treeview(table_frame, columns=ResultsModel.COLUMNS, show="headings")
+        for column in ResultsModel.COLUMNS:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
         self.tree.column("Input SKU", width=200)
         self.tree.column("Mapped MSKU", width=200)
         self.tree.column("Status", width=100)
+        self.tree.tag_configure("mapped", background="#e6f7e6")
+        self.tree.tag_configure("unmapped", background="#ffe6e6")
         
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
         
-        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
-        vsb.grid(row=0, column=1, sticky=tk.NS)
-        hsb.grid(row=1, column=0, sticky=tk.EW)
-        table_frame.grid_rowconfigure(0, weight=1)
+        self.tree.grid(row=1, column=0, sticky=tk.NSEW)
+        vsb.grid(row=1, column=1, sticky=tk.NS)
+        hsb.grid(row=2, column=0, sticky=tk.EW)
+        table_frame.grid_rowconfigure(1, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
         # Log panel
@@ -96,13 +155,18 @@ class MappingApp(tk.Tk):
         
         ttk.Button(btn_frame, text="Export CSV", command=lambda: self.export_data('csv')).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Export Excel", command=lambda: self.export_data('excel')).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Unmapped Report", command=self.export_unmapped_report).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Add Combo Product", command=self.add_combo_dialog).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="Confirm Selected", command=self.confirm_selected).pack(side=tk.RIGHT, padx=5)
     
     def browse_master(self):
         file_path = filedialog.askopenfilename(
             filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("All files", "*.*")]
         )
         if file_path:
+            if self.job is not None:
+                messagebox.showinfo("Info", "Wait for the current run to finish or cancel it first")
+                return
             self.master_path.set(file_path)
             if self.mapper.load_master(file_path):
                 logging.info("Master SKUs loaded successfully")
@@ -123,37 +187,147 @@ class MappingApp(tk.Tk):
             messagebox.showerror("Error", "Please select a sales data file")
             return
         
-        marketplace = self.marketplace.get()
-        self.processed_data = self.mapper.process_file(
-            self.sales_path.get(), 
-            marketplace
+        if self.job is not None:
+            return
+        
+        # Mapping runs on a worker thread; it only talks to the UI through this queue
+        sales_path = self.sales_path.get()
+        messages = queue.Queue()
+        cancel = threading.Event()
+        worker = threading.Thread(
+            target=self._map_in_background,
+            args=(sales_path, self.marketplace.get(), messages, cancel),
+            daemon=True
         )
+        self.job = (worker, messages, cancel)
+        self.total_rows = None
+        self.process_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.progress.config(mode="determinate", value=0)
+        self.progress_label.config(text="Starting...")
+        logging.info(f"Processing {os.path.basename(sales_path)}")
+        worker.start()
+        self.after(100, self._poll_worker)
+    
+    def _map_in_background(self, sales_path, marketplace, messages, cancel):
+        try:
+            messages.put(("total", estimate_rows(sales_path)))
+            chunks = self.mapper.process_file_chunks(sales_path, marketplace, chunksize=CHUNK_ROWS)
+            frames = []
+            done = 0
+            for chunk in chunks:
+                if cancel.is_set():
+                    chunks.close()
+                    messages.put(("cancelled", done))
+                    return
+                frames.append(chunk)
+                done += len(chunk)
+                messages.put(("progress", done))
+            messages.put(("done", pd.concat(frames, ignore_index=True) if frames else None))
+        except Exception as e:
+            messages.put(("error", str(e)))
+    
+    def _poll_worker(self):
+        worker, messages, cancel = self.job
+        finished = False
+        while True:
+            try:
+                kind, payload = messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "total":
+                self.total_rows = payload
+                if payload:
+                    self.progress.config(maximum=payload)
+                else:
+                    self.progress.config(mode="indeterminate")
+                    self.progress.start(50)
+            elif kind == "progress":
+                if self.total_rows:
+                    self.progress.config(value=min(payload, self.total_rows))
+                    self.progress_label.config(text=f"{payload:,} of ~{self.total_rows:,} rows")
+                else:
+                    self.progress_label.config(text=f"{payload:,} rows")
+            elif kind == "done":
+                finished = True
+                if payload is None:
+                    logging.warning("No rows found in the sales file")
+                else:
+                    self.processed_data = payload
+                    self.display_results()
+                    logging.info("Data processing completed")
+            elif kind == "cancelled":
+                finished = True
+                logging.info(f"Processing cancelled after {payload:,} rows")
+            elif kind == "error":
+                finished = True
+                logging.error(f"Error processing file: {payload}")
         
-        if self.processed_data is not None:
-            self.display_results()
-            logging.info("Data processing completed")
+        if finished:
+            self.job = None
+            self.progress.stop()
+            self.progress.config(mode="determinate", value=0)
+            self.progress_label.config(text="")
+            self.process_btn.config(state=tk.NORMAL)
+            self.cancel_btn.config(state=tk.DISABLED)
+        else:
+            self.after(100, self._poll_worker)
+    
+    def cancel_processing(self):
+        if self.job is not None:
+            # Takes effect at the next chunk boundary
+            self.job[2].set()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.progress_label.config(text="Cancelling...")
     
     def display_results(self):
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Populate treeview
-        sku_col = next((col for col in self.processed_data.columns if 'sku' in col.lower()), None)
+        profile = self.mapper.last_profile
+        sku_col = profile.column('sku', self.processed_data) if profile is not None else None
+        sku_col = sku_col or next((col for col in self.processed_data.columns if 'sku' in col.lower() and col != 'MSKU'), None)
         if not sku_col:
             logging.error("SKU column not found in processed data")
             return
         
-        for _, row in self.processed_data.iterrows():
-            sku = row[sku_col]
-            msku = row.get('MSKU', '')
-            status = "Mapped" if pd.notna(msku) and msku != '' else "Unmapped"
+        self.results = ResultsModel(self.processed_data, sku_col)
+        self.results.set_filter(self.result_filter.get())
+        self._update_headings()
+        self.render_page()
+    
+    def render_page(self):
+        # Replaces at most one page of items, however large the result set is
+        self.tree.delete(*self.tree.get_children())
+        # Items are named by row position so a selection maps back to the frame
+        rows = zip(self.results.page_positions(), self.results.page_rows())
+        for position, (sku, msku, status) in rows:
             tags = ("mapped",) if status == "Mapped" else ("unmapped",)
-            self.tree.insert("", tk.END, values=(sku, msku, status), tags=tags)
-        
-        # Configure tag colors
-        self.tree.tag_configure("mapped", background="#e6f7e6")
-        self.tree.tag_configure("unmapped", background="#ffe6e6")
+            self.tree.insert("", tk.END, iid=str(position), values=(sku, msku, status), tags=tags)
+        self.page_label.config(text=self.results.page_label())
+    
+    def show_page(self, step):
+        if self.results is None:
+            return
+        self.results.go_to(self.results.page + step)
+        self.render_page()
+    
+    def apply_filter(self):
+        if self.results is None:
+            return
+        self.results.set_filter(self.result_filter.get())
+        self.render_page()
+    
+    def sort_by(self, column):
+        if self.results is None:
+            return
+        self.results.toggle_sort(column)
+        self._update_headings()
+        self.render_page()
+    
+    def _update_headings(self):
+        for column in ResultsModel.COLUMNS:
+            text = column
+            if self.results is not None and self.results.sort_column == column:
+                text += " \u25bc" if self.results.descending else " \u25b2"
+            self.tree.heading(column, text=text)
     
     def export_data(self, format):
         if self.processed_data is None:
@@ -178,6 +352,47 @@ class MappingApp(tk.Tk):
             logging.error(f"Export error: {str(e)}")
             messagebox.showerror("Error", f"Failed to export data: {str(e)}")
     
+    def export_unmapped_report(self):
+        if self.processed_data is None or self.job is not None:
+            messagebox.showinfo("Info", "No data to report on. Process data first.")
+            return
+        if not self.mapper.last_unmapped:
+            messagebox.showinfo("Info", "Every SKU was mapped")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not file_path:
+            return
+        
+        try:
+            report = self.mapper.build_report()
+            report.to_csv(file_path, index=False)
+            logging.info(f"Unmapped report with {len(report)} distinct SKUs saved to {file_path}")
+        except Exception as e:
+            logging.error(f"Report export error: {str(e)}")
+            messagebox.showerror("Error", f"Failed to export report: {str(e)}")
+    
+    def confirm_selected(self):
+        if self.job is not None:
+            messagebox.showinfo("Info", "Wait for the current run to finish or cancel it first")
+            return
+        pairs = []
+        for item in self.tree.selection():
+            pair = self.results.mapped_pair(int(item))
+            if pair is not None:
+                pairs.append(pair)
+        if not pairs:
+            messagebox.showinfo("Info", "Select mapped rows to confirm their mappings")
+            return
+        
+        # Confirmations made under "general" apply to every marketplace
+        marketplace = self.marketplace.get()
+        count = self.mapper.confirm_mappings(pairs, None if marketplace == "general" else marketplace)
+        logging.info(f"Saved {count} confirmed mappings")
+    
     def add_combo_dialog(self):
         dialog = tk.Toplevel(self)
         dialog.title("Add Combo Product")
@@ -194,6 +409,9 @@ class MappingApp(tk.Tk):
         msku_entry.pack(padx=10, fill=tk.X)
         
         def save_combo():
+            if self.job is not None:
+                messagebox.showinfo("Info", "Wait for the current run to finish or cancel it first")
+                return
             skus = [s.strip() for s in sku_entry.get().split(",") if s.strip()]
             msku = msku_entry.get().strip()
             
@@ -215,17 +433,39 @@ class MappingApp(tk.Tk):
         ttk.Button(btn_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
 
 class TextHandler(logging.Handler):
-    def __init__(self, text_widget):
+    # Records can arrive from the mapping thread; only the Tk thread touches the widget,
+    # once per interval for everything buffered since the last drain
+    def __init__(self, text_widget, interval=100, max_lines=2000):
         super().__init__()
         self.text_widget = text_widget
+        self.interval = interval
+        self.max_lines = max_lines
+        self.records = queue.SimpleQueue()
         self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.after(self.interval, self.drain)
     
     def emit(self, record):
-        msg = self.format(record)
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.insert(tk.END, msg + "\n")
-        self.text_widget.see(tk.END)
-        self.text_widget.config(state=tk.DISABLED)
+        self.records.put(self.format(record))
+    
+    def drain(self):
+        # Not flush(): logging.shutdown() calls that after the window is gone
+        lines = []
+        while True:
+            try:
+                lines.append(self.records.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            lines = lines[-self.max_lines:]
+            self.text_widget.config(state=tk.NORMAL)
+            self.text_widget.insert(tk.END, "\n".join(lines) + "\n")
+            # Keep the widget bounded; the oldest lines go first
+            excess = int(self.text_widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                self.text_widget.delete("1.0", f"{excess + 1}.0")
+            self.text_widget.see(tk.END)
+            self.text_widget.config(state=tk.DISABLED)
+        self.text_widget.after(self.interval, self.drain)
 
 if __name__ == "__main__":
     app = MappingApp()
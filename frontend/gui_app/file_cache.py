@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".warehouse_mvp", "parsed")
+
+# A source is a path or an in-memory upload (a binary file-like object with a .name)
+def source_name(source):
+    return source if isinstance(source, str) else getattr(source, "name", "")
+
+def rewind(source):
+    if not isinstance(source, str):
+        source.seek(0)
+    return source
+
+def file_hash(source):
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        rewind(source)
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+        rewind(source)
+    return digest.hexdigest()
+
+class ParsedFileCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger("ParsedFileCache")
+
+    def _entry_path(self, content_hash, columns):
+        key = hashlib.sha256(f"{content_hash}|{columns!r}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.feather")
+
+    def read(self, file_path, reader, columns=None, content_hash=None):
+        try:
+            from pyarrow import feather
+        except ImportError:
+            return reader()
+
+        content_hash = content_hash or file_hash(file_path)
+        entry = self._entry_path(content_hash, columns)
+        if os.path.exists(entry):
+            try:
+                df = feather.read_table(entry, memory_map=True).to_pandas()
+                os.utime(entry)
+                self.hits += 1
+                return df
+            except Exception as e:
+                self.logger.warning(f"Dropping unreadable cache entry {entry}: {str(e)}")
+                self._remove(entry)
+
+        self.misses += 1
+        df = reader()
+        tmp_path = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            feather.write_feather(df.reset_index(drop=True), tmp_path)
+            os.replace(tmp_path, entry)
+            self.evict()
+        except Exception as e:
+            # Mixed-type object columns can't be stored as Arrow; just skip caching
+            self.logger.info(f"Not caching {os.path.basename(source_name(file_path))}: {str(e)}")
+            self._remove(tmp_path)
+        return df
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        paths = [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".feather")
+        ]
+        return sorted((os.stat(p).st_mtime, os.path.getsize(p), p) for p in paths)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        # Least recently used first; hits refresh the mtime
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def purge(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+        self.logger.info("Parsed file cache purged")
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".warehouse_mvp", "sku_map_cache.pkl")
+
+# Bumped when the key layout changes, so entries saved under the old one are dropped
+KEY_FORMAT = 2
+
+class MappingCache:
+    def __init__(self, max_size=100000, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Set by track_added in pool workers, which hand new entries back instead of saving
+        self.added = None
+        self.logger = logging.getLogger("MappingCache")
+
+    @staticmethod
+    def make_version(master_hash, combo_products, learned=None):
+        key = f"{KEY_FORMAT}|{master_hash}|{repr(sorted(combo_products.items()))}"
+        if learned:
+            key += f"|{repr(sorted((market, sorted(skus.items())) for market, skus in learned.items()))}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def set_version(self, version):
+        if version == self.version:
+            return
+        self.version = version
+        self.entries.clear()
+        self.load()
+
+    def get(self, key, default=None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.added is not None:
+            self.added[key] = value
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def track_added(self):
+        self.added = {}
+
+    def drain_added(self):
+        added = self.added or {}
+        if self.added is not None:
+            self.added = {}
+        return added
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                stored = pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable mapping cache: {str(e)}")
+            return
+
+        # Entries built against another master file or combo table are stale
+        if stored.get("version") != self.version:
+            return
+        for key, value in stored["entries"]:
+            self.put(key, value)
+
+    def save(self):
+        if not self.path or self.version is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Unique per thread too: Streamlit sessions share one process
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"version": self.version, "entries": list(self.entries.items())}, f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".warehouse_mvp", "sku_mappings.db")
+
+# Stays under SQLite's default limit on bound parameters per statement
+LOOKUP_BATCH = 500
+
+# MSKU columns (and the master's sku) have no declared type, so SQLite keeps each value's
+# own type and a numeric MSKU comes back as a number, as it would from the spreadsheet
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS master (
+    position INTEGER PRIMARY KEY,
+    sku,
+    sku_key TEXT,
+    msku
+);
+CREATE INDEX IF NOT EXISTS master_sku_key ON master (sku_key);
+CREATE TABLE IF NOT EXISTS learned (
+    marketplace TEXT NOT NULL,
+    sku_key TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    msku NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (marketplace, sku_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS combos (
+    combo TEXT PRIMARY KEY,
+    msku NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+def _plain(value):
+    # numpy scalars from DataFrame cells can't be bound as SQLite parameters
+    return value.item() if hasattr(value, 'item') else value
+
+def market_key(marketplace):
+    # '' holds mappings that apply to every marketplace
+    return (marketplace or '').lower()
+
+class MappingStore:
+    # Only the path is kept between calls, so a mapper holding a store still pickles
+    # into pool workers and can be used from the GUI's mapping thread
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.logger = logging.getLogger("MappingStore")
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._ready = True
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_ready'] = False
+        return state
+
+    def _get_meta(self, conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def master_hash(self):
+        with closing(self._connect()) as conn:
+            return self._get_meta(conn, 'master_hash')
+
+    def master_source(self):
+        with closing(self._connect()) as conn:
+            return self._get_meta(conn, 'master_source')
+
+    def replace_master(self, master_map, master_hash, source=None):
+        # master_map has the mapper's SKU/MSKU columns; row order is kept so the
+        # first-row-wins rule for duplicate SKUs survives a reload
+        skus = master_map['SKU'].astype(object).where(master_map['SKU'].notna(), None).tolist()
+        mskus = master_map['MSKU'].astype(object).where(master_map['MSKU'].notna(), None).tolist()
+        rows = ((sku, None if sku is None else str(sku).lower(), msku) for sku, msku in zip(skus, mskus))
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM master")
+            conn.executemany("INSERT INTO master (sku, sku_key, msku) VALUES (?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [('master_hash', master_hash), ('master_source', source)]
+            )
+        self.logger.info(f"Stored {len(master_map)} master mappings")
+
+    def load_master(self, master_hash=None):
+        # Returns (master_hash, master_map), or (None, None) when nothing is stored or the
+        # stored master isn't master_hash. One read transaction covers the hash check and
+        # the rows, so another session's replace_master can't land in between
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            try:
+                stored = self._get_meta(conn, 'master_hash')
+                if stored is None or (master_hash is not None and stored != master_hash):
+                    return None, None
+                df = pd.read_sql_query("SELECT sku, msku FROM master ORDER BY position", conn)
+            finally:
+                conn.rollback()
+        df.columns = ['SKU', 'MSKU']
+        return stored, df
+
+    def upsert_mappings(self, pairs, marketplace=None, source='confirmed'):
+        # Bulk insert-or-update of (sku, msku) pairs learned for one marketplace
+        now = time.time()
+        rows = [
+            (market_key(marketplace), str(sku).lower(), str(sku), _plain(msku), source, now)
+            for sku, msku in pairs
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO learned (marketplace, sku_key, sku, msku, source, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (marketplace, sku_key) DO UPDATE SET "
+                "sku = excluded.sku, msku = excluded.msku, source = excluded.source, "
+                "updated_at = excluded.updated_at",
+                rows
+            )
+        return len(rows)
+
+    def remove_mappings(self, skus, marketplace=None):
+        keys = [(market_key(marketplace), str(sku).lower()) for sku in skus]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM learned WHERE marketplace = ? AND sku_key = ?", keys)
+
+    def learned(self):
+        # marketplace -> {lower-cased sku: msku}
+        learned = {}
+        with closing(self._connect()) as conn:
+            for marketplace, key, msku in conn.execute("SELECT marketplace, sku_key, msku FROM learned"):
+                learned.setdefault(marketplace, {})[key] = msku
+        return learned
+
+    def learned_version(self):
+        # Changes whenever a mapping is confirmed or removed
+        with closing(self._connect()) as conn:
+            count, latest = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM learned").fetchone()
+            combos, combo_latest = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM combos").fetchone()
+        return f"{count}:{latest}:{combos}:{combo_latest}"
+
+    def save_combo(self, key, msku):
+        self.save_combos([(key, msku)])
+
+    def save_combos(self, combos):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO combos (combo, msku, updated_at) VALUES (?, ?, ?)",
+                [(json.dumps(list(key)), _plain(msku), now) for key, msku in combos]
+            )
+
+    def combos(self):
+        with closing(self._connect()) as conn:
+            return {tuple(json.loads(combo)): msku for combo, msku in conn.execute("SELECT combo, msku FROM combos")}
+
+    def lookup_many(self, skus, marketplace=None):
+        # Same precedence as SKUMapper: the master first, then mappings learned for this
+        # marketplace, then those learned for every marketplace
+        keys = list({str(sku).lower() for sku in skus})
+        master = {}
+        learned = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[i:i + LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                # Later rows overwrite earlier ones, so the first master row and the
+                # marketplace-specific learned row win
+                master.update(conn.execute(
+                    f"SELECT sku_key, msku FROM master WHERE sku_key IN ({marks}) ORDER BY position DESC",
+                    batch
+                ))
+                learned.update(conn.execute(
+                    f"SELECT sku_key, msku FROM learned WHERE marketplace IN ('', ?) AND sku_key IN ({marks}) "
+                    f"ORDER BY marketplace",
+                    [market_key(marketplace)] + batch
+                ))
+        results = {}
+        for sku in skus:
+            key = str(sku).lower()
+            msku = master.get(key)
+            results[sku] = msku if msku is not None else learned.get(key)
+        return results
+
+    def lookup(self, sku, marketplace=None):
+        return self.lookup_many([sku], marketplace)[sku]
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            return {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('master', 'learned', 'combos')
+            }
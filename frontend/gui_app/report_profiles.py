@@ -0,0 +1,276 @@
+import csv
+import io
+import logging
+
+import pandas as pd
+
+try:
+    from .file_cache import rewind, source_name
+except ImportError:
+    from file_cache import rewind, source_name
+
+logger = logging.getLogger("ReportProfiles")
+
+# Rows scanned for a matching header; some exports put a title or blank line first
+HEADER_SCAN_ROWS = 5
+
+# Amazon seller SKUs are free text of up to 40 characters; ledgers carry ones with
+# spaces, slashes or only two characters ("Money Heist 1", "Square/Big", "K9")
+AMAZON_MSKU_PATTERN = r'^\S(?:[^\t\r\n]{0,38}\S)?$'
+
+# Role -> canonical column; profiles only override what differs
+DEFAULT_ROLES = {
+    'sku': 'sku',
+    'order_id': 'order_id',
+    'price': 'price',
+    'date': 'order_date',
+    'fulfillment_center': 'fulfillment_center',
+}
+
+class ReportProfile:
+    def __init__(self, name, marketplace, columns, fingerprint, dtypes=None, dates=None, money=None,
+                 roles=None, sku_pattern=None):
+        self.name = name
+        self.marketplace = marketplace
+        # Source header -> canonical name; only these columns are read, in this order
+        self.columns = columns
+        self.fingerprint = frozenset(fingerprint)
+        # Canonical name -> pandas dtype, applied while parsing
+        self.dtypes = dtypes or {}
+        # Canonical name -> strftime format (None lets pandas infer); stored as naive UTC
+        self.dates = dates or {}
+        # Canonical names holding currency strings such as "$1,299.00"
+        self.money = set(money or ())
+        self.roles = {**DEFAULT_ROLES, **(roles or {})}
+        # Validates the sku column instead of the marketplace's pattern when it holds another kind of ID
+        self.sku_pattern = sku_pattern
+
+    def column(self, role, df=None):
+        col = self.roles.get(role)
+        if df is not None and col not in df.columns:
+            return None
+        return col
+
+    def matches(self, header):
+        return self.fingerprint <= {str(h).strip() for h in header if h is not None}
+
+    def _source_dtypes(self):
+        canonical = {target: source for source, target in self.columns.items()}
+        dtypes = {}
+        for target, dtype in self.dtypes.items():
+            if target in canonical and target not in self.dates and target not in self.money:
+                dtypes[canonical[target]] = dtype
+        for target in self.money:
+            dtypes[canonical[target]] = str
+        return dtypes
+
+    def _csv_options(self, header_row):
+        wanted = set(self.columns)
+        return {
+            'usecols': lambda c: c.strip() in wanted,
+            'dtype': self._source_dtypes(),
+            'skiprows': header_row,
+        }
+
+    def finish(self, df):
+        # Rename to canonical names and convert what the parser can't type by itself
+        df = df.rename(columns=lambda c: self.columns.get(str(c).strip(), c))
+        df = df[[target for target in self.columns.values() if target in df.columns]]
+        for target, fmt in self.dates.items():
+            if target in df.columns:
+                parsed = pd.to_datetime(df[target], format=fmt, errors='coerce', utc=True)
+                df[target] = parsed.dt.tz_localize(None)
+        for target in self.money:
+            if target in df.columns:
+                df[target] = pd.to_numeric(
+                    df[target].astype(str).str.replace(r'[^0-9.\-]', '', regex=True),
+                    errors='coerce'
+                )
+        return df
+
+    def coerce(self, df):
+        # For frames parsed without the profile (Excel, openpyxl chunks)
+        df = df[[c for c in df.columns if str(c).strip() in self.columns]].copy()
+        dtypes = {c: d for c, d in self._source_dtypes().items() if c in df.columns}
+        for source, dtype in dtypes.items():
+            try:
+                df[source] = df[source].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+        return self.finish(df)
+
+    def read_csv(self, file_path, header_row=0):
+        return self.finish(pd.read_csv(rewind(file_path), **self._csv_options(header_row)))
+
+    def read_csv_chunks(self, file_path, chunksize, header_row=0):
+        for chunk in pd.read_csv(rewind(file_path), chunksize=chunksize, **self._csv_options(header_row)):
+            yield self.finish(chunk)
+
+    def read_excel(self, file_path, header_row=0):
+        wanted = set(self.columns)
+        return self.coerce(pd.read_excel(
+            rewind(file_path),
+            usecols=lambda c: str(c).strip() in wanted,
+            skiprows=header_row
+        ))
+
+    def read(self, file_path, header_row=0):
+        if source_name(file_path).endswith('.xlsx'):
+            return self.read_excel(file_path, header_row)
+        return self.read_csv(file_path, header_row)
+
+PROFILES = {}
+
+def register_profile(profile):
+    PROFILES[profile.name] = profile
+    return profile
+
+register_profile(ReportProfile(
+    'amazon_ledger',
+    'amazon',
+    columns={
+        'Date': 'date',
+        'FNSKU': 'fnsku',
+        'ASIN': 'asin',
+        'MSKU': 'sku',
+        'Event Type': 'event_type',
+        'Reference ID': 'order_id',
+        'Quantity': 'quantity',
+        'Fulfillment Center': 'fulfillment_center',
+        'Disposition': 'disposition',
+        'Reason': 'reason',
+        'Country': 'country',
+    },
+    fingerprint=['FNSKU', 'ASIN', 'MSKU', 'Event Type', 'Fulfillment Center', 'Disposition'],
+    dtypes={
+        'fnsku': 'category',
+        'asin': 'category',
+        'sku': 'category',
+        'event_type': 'category',
+        'order_id': str,
+        'quantity': 'Int32',
+        'fulfillment_center': 'category',
+        'disposition': 'category',
+        'reason': 'category',
+        'country': 'category',
+    },
+    dates={'date': '%m/%d/%Y'},
+    roles={'date': 'date'},
+    # The ledger is mapped on MSKU, the seller SKU, not the ASIN the amazon pattern checks
+    sku_pattern=AMAZON_MSKU_PATTERN,
+))
+
+register_profile(ReportProfile(
+    'shopify_orders',
+    'shopify',
+    columns={
+        'Name': 'order_id',
+        'Created at': 'order_date',
+        'Financial Status': 'financial_status',
+        'Fulfillment Status': 'shipping_status',
+        'Currency': 'currency',
+        'Lineitem sku': 'sku',
+        'Lineitem quantity': 'quantity',
+        'Lineitem price': 'price',
+    },
+    fingerprint=['Name', 'Created at', 'Lineitem sku', 'Lineitem quantity', 'Lineitem price'],
+    dtypes={
+        'order_id': str,
+        'financial_status': 'category',
+        'shipping_status': 'category',
+        'currency': 'category',
+        'sku': 'category',
+        'quantity': 'Int32',
+        'price': 'float64',
+    },
+    dates={'order_date': '%Y-%m-%d %H:%M:%S %z'},
+))
+
+register_profile(ReportProfile(
+    'ebay_orders',
+    'ebay',
+    columns={
+        'Order Number': 'order_id',
+        'Sale Date': 'order_date',
+        'Item Number': 'item_number',
+        'Custom Label': 'sku',
+        'Quantity': 'quantity',
+        'Sold For': 'price',
+        'Ship To Country': 'country',
+    },
+    fingerprint=['Order Number', 'Item Number', 'Custom Label', 'Sold For', 'Sale Date'],
+    dtypes={
+        'order_id': str,
+        'item_number': str,
+        'sku': 'category',
+        'quantity': 'Int32',
+        'country': 'category',
+    },
+    dates={'order_date': '%b-%d-%y'},
+    money=['price'],
+))
+
+register_profile(ReportProfile(
+    'walmart_orders',
+    'walmart',
+    columns={
+        'Order#': 'order_id',
+        'Order Date': 'order_date',
+        'Status': 'status',
+        'SKU': 'sku',
+        'Qty': 'quantity',
+        'Item Cost': 'price',
+        'Fulfillment Entity': 'fulfillment_center',
+    },
+    fingerprint=['PO#', 'Order#', 'SKU', 'Qty', 'Item Cost'],
+    dtypes={
+        'order_id': str,
+        'status': 'category',
+        'sku': 'category',
+        'quantity': 'Int32',
+        'fulfillment_center': 'category',
+    },
+    dates={'order_date': None},
+    money=['price'],
+))
+
+def _header_rows(file_path):
+    if source_name(file_path).endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(rewind(file_path), read_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True)
+            return [list(row) for row in rows]
+        finally:
+            workbook.close()
+    if isinstance(file_path, str):
+        with open(file_path, newline='', encoding='utf-8-sig', errors='replace') as f:
+            return _csv_rows(f)
+    # Uploads: the first 64KB is plenty for a few header rows
+    head = rewind(file_path).read(1 << 16)
+    rewind(file_path)
+    return _csv_rows(io.StringIO(head.decode('utf-8-sig', errors='replace'), newline=''))
+
+def _csv_rows(f):
+    rows = []
+    for row in csv.reader(f):
+        rows.append(row)
+        if len(rows) == HEADER_SCAN_ROWS:
+            break
+    return rows
+
+def detect_profile(file_path, marketplace=None):
+    # Returns (profile, header_row), or (None, 0) when no profile matches
+    try:
+        rows = _header_rows(file_path)
+    except Exception as e:
+        logger.warning(f"Could not read header of {source_name(file_path)}: {str(e)}")
+        return None, 0
+
+    # The selected marketplace's profiles are tried first
+    profiles = sorted(PROFILES.values(), key=lambda p: p.marketplace != (marketplace or '').lower())
+    for header_row, header in enumerate(rows):
+        for profile in profiles:
+            if profile.matches(header):
+                return profile, header_row
+    return None, 0
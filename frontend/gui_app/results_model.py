@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+class ResultsModel:
+    # Filtered, sorted view over the mapped frame; the Treeview only ever holds one page of it
+    FILTERS = ("All", "Mapped", "Unmapped")
+    COLUMNS = ("Input SKU", "Mapped MSKU", "Status")
+
+    def __init__(self, df, sku_col, page_size=200):
+        self.df = df
+        self.sku_col = sku_col
+        self.page_size = page_size
+        msku = df['MSKU']
+        self.mapped = (msku.notna() & (msku.astype(str) != '')).to_numpy()
+        self.filter = "All"
+        self.sort_column = None
+        self.descending = False
+        self.page = 0
+        self.positions = np.arange(len(df))
+
+    def _sort_key(self, column):
+        if column == "Status":
+            return pd.Series(self.mapped)
+        values = self.df[self.sku_col if column == "Input SKU" else 'MSKU']
+        return pd.Series(values.to_numpy())
+
+    def refresh(self):
+        positions = np.arange(len(self.df))
+        if self.filter == "Mapped":
+            positions = positions[self.mapped]
+        elif self.filter == "Unmapped":
+            positions = positions[~self.mapped]
+
+        if self.sort_column is not None:
+            values = self._sort_key(self.sort_column).iloc[positions].reset_index(drop=True)
+            try:
+                order = values.sort_values(ascending=not self.descending, kind='stable', na_position='last')
+            except TypeError:
+                # Mixed numeric and text SKUs compare as text
+                order = values.where(values.isna(), values.astype(str)).sort_values(
+                    ascending=not self.descending, kind='stable', na_position='last'
+                )
+            positions = positions[order.index.to_numpy()]
+
+        self.positions = positions
+        self.page = min(self.page, self.page_count - 1)
+
+    def set_filter(self, name):
+        self.filter = name
+        self.page = 0
+        self.refresh()
+
+    def toggle_sort(self, column):
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        self.page = 0
+        self.refresh()
+
+    @property
+    def row_count(self):
+        return len(self.positions)
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.row_count // self.page_size))
+
+    def go_to(self, page):
+        self.page = max(0, min(page, self.page_count - 1))
+
+    def page_positions(self):
+        start = self.page * self.page_size
+        return self.positions[start:start + self.page_size]
+
+    def page_rows(self):
+        rows = self.page_positions()
+        skus = self.df[self.sku_col].to_numpy()[rows]
+        mskus = self.df['MSKU'].to_numpy()[rows]
+        mapped = self.mapped[rows]
+        return [
+            (sku, msku if is_mapped else '', "Mapped" if is_mapped else "Unmapped")
+            for sku, msku, is_mapped in zip(skus, mskus, mapped)
+        ]
+
+    def mapped_pair(self, position):
+        # (sku, msku) of one row with the frame's own types, which the Treeview's display
+        # strings don't keep; None when the row is unmapped
+        if not self.mapped[position]:
+            return None
+        sku = self.df[self.sku_col].iat[position]
+        msku = self.df['MSKU'].iat[position]
+        return tuple(v.item() if isinstance(v, np.generic) else v for v in (sku, msku))
+
+    def page_label(self):
+        if not self.row_count:
+            return "No rows"
+        start = self.page * self.page_size
+        end = min(start + self.page_size, self.row_count)
+        return f"Rows {start + 1:,}-{end:,} of {self.row_count:,} (page {self.page + 1} of {self.page_count})"
@@ -1,109 +1,636 @@
 import pandas as pd
 import numpy as np
-from thefuzz import fuzz, process
 import re
+import time
 import logging
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    from .file_cache import file_hash, rewind, source_name
+    from .mapping_cache import MappingCache
+    from .report_profiles import detect_profile
+    from .mapping_store import market_key
+except ImportError:
+    from file_cache import file_hash, rewind, source_name
+    from mapping_cache import MappingCache
+    from report_profiles import detect_profile
+    from mapping_store import market_key
+
+_MISS = object()
+
+class FuzzyIndex:
+    NGRAM = 2
+    # Report candidates scoring below this share too little with the SKU to help anyone
+    NEAREST_MIN_SCORE = 50
+
+    def __init__(self, skus, mskus, score_cutoff=80):
+        self.score_cutoff = score_cutoff
+        self.skus = list(skus)
+        first = ~skus.duplicated()
+        self.msku_by_sku = dict(zip(skus[first], mskus[first]))
+        
+        from thefuzz import utils
+        
+        # Same preprocessing thefuzz applies to both sides before scoring
+        self.choices = [utils.full_process(str(s)) if pd.notna(s) else None for s in self.skus]
+        self.lengths = np.array([len(c) if c is not None else 0 for c in self.choices])
+        
+        postings = {}
+        for pos, choice in enumerate(self.choices):
+            if choice is None:
+                continue
+            for gram in self._grams(choice):
+                postings.setdefault(gram, []).append(pos)
+        self.postings = {g: np.array(p) for g, p in postings.items()}
+
+    def _grams(self, text):
+        n = self.NGRAM
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _hits(self, query):
+        # Number of the query's distinct n-grams each choice contains
+        n = self.NGRAM
+        grams = [query[i:i + n] for i in range(len(query) - n + 1)]
+        hit_lists = [self.postings[g] for g in grams if g in self.postings]
+        if not hit_lists:
+            return None
+        return np.bincount(np.concatenate(hit_lists), minlength=len(self.choices))
+
+    def _candidates(self, query):
+        # Strings this short can reach the cutoff without sharing an n-gram
+        if len(query) < 4:
+            return np.arange(len(self.choices))
+        
+        hits = self._hits(query)
+        if hits is None:
+            return np.flatnonzero(self.lengths < 4)
+        
+        # A partial_ratio of 80 on the shorter string of length m keeps at
+        # least m/3 - 1 aligned bigrams intact, so anything below is pruned
+        shorter = np.minimum(len(query), self.lengths)
+        needed = np.maximum(1, np.ceil(shorter / 3 - 1))
+        return np.flatnonzero((hits >= needed) | (self.lengths < 4))
+
+    def best_match(self, input_sku):
+        from thefuzz import fuzz, process, utils
+        
+        query = utils.full_process(input_sku)
+        candidates = {
+            pos: self.choices[pos]
+            for pos in self._candidates(query)
+            if self.choices[pos] is not None
+        }
+        match = process.extractOne(
+            query,
+            candidates,
+            processor=None,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=self.score_cutoff
+        )
+        if match:
+            return self.msku_by_sku[self.skus[match[2]]]
+        return None
+
+    def best_matches(self, input_skus):
+        return {sku: self.best_match(sku) for sku in set(input_skus)}
+
+    def nearest(self, input_sku, limit=50, min_score=NEAREST_MIN_SCORE):
+        # Closest master SKU below the match cutoff, for reports: only the
+        # choices sharing the most n-grams with the query are scored
+        from thefuzz import fuzz, process, utils
+        
+        query = utils.full_process(str(input_sku))
+        hits = self._hits(query)
+        if hits is None:
+            positions = np.arange(min(limit, len(self.choices)))
+        elif len(hits) > limit:
+            positions = np.argpartition(-hits, limit)[:limit]
+        else:
+            positions = np.arange(len(hits))
+        candidates = {
+            pos: self.choices[pos]
+            for pos in sorted(positions)
+            if self.choices[pos] is not None
+        }
+        if not query or not candidates:
+            return None
+        match = process.extractOne(
+            query, candidates, processor=None, scorer=fuzz.partial_ratio, score_cutoff=min_score
+        )
+        if not match:
+            return None
+        sku = self.skus[match[2]]
+        return sku, self.msku_by_sku[sku], match[1]
 
 class SKUMapper:
-    def __init__(self):
+    SKU_PATTERNS = {
+        'amazon': r'^[A-Z0-9]{10}$',
+        'shopify': r'^[a-zA-Z0-9_\-]{5,}$',
+        'default': r'^[\w\-]{3,}$'
+    }
+    REPORT_COLUMNS = ['sku', 'reason', 'count', 'best_candidate', 'candidate_msku', 'score']
+    # Only the most frequent distinct SKUs get a nearest-candidate lookup
+    REPORT_CANDIDATES = 1000
+
+    def __init__(self, cache_size=100000, cache_path=None, file_cache=None, store=None):
         self.master_map = pd.DataFrame(columns=["SKU", "MSKU"])
+        self.sku_index = {}
+        self.fuzzy_index = None
         self.combo_products = {}
+        # marketplace ('' = all) -> {lower-cased sku: msku} confirmed by an operator
+        self.learned = {}
+        self.master_hash = None
+        self.last_summary = None
+        self.last_unmapped = Counter()
+        self.last_profile = None
+        # stage -> [calls, seconds, rows], collected until drain_stage_times()
+        self.stage_times = {}
+        self._cache_marks = {}
+        self.file_cache = file_cache
+        self.store = store
+        self.cache = MappingCache(max_size=cache_size, path=cache_path)
         self.logger = logging.getLogger("SKUMapper")
         logging.basicConfig(level=logging.INFO)
     
+    def _record_stage(self, stage, seconds, rows=0):
+        entry = self.stage_times.setdefault(stage, [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += rows
+
+    @contextmanager
+    def _timed(self, stage, rows=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_stage(stage, time.perf_counter() - start, rows)
+
+    def drain_stage_times(self):
+        # Plain data so pool workers can hand it back to the parent process
+        totals = {'mapping': (self.cache.hits, self.cache.misses)}
+        if self.file_cache is not None:
+            totals['parsed_file'] = (self.file_cache.hits, self.file_cache.misses)
+        caches = {}
+        for name, (hits, misses) in totals.items():
+            seen_hits, seen_misses = self._cache_marks.get(name, (0, 0))
+            caches[name] = (hits - seen_hits, misses - seen_misses)
+        report = {'stages': self.stage_times, 'caches': caches}
+        self.stage_times = {}
+        self._cache_marks = totals
+        return report
+
+    def _read_file(self, file_path, content_hash=None, stage='parse', profile=None, header_row=0):
+        def reader():
+            if profile is not None:
+                return profile.read(file_path, header_row)
+            if source_name(file_path).endswith('.xlsx'):
+                return pd.read_excel(rewind(file_path))
+            return pd.read_csv(rewind(file_path))
+        
+        start = time.perf_counter()
+        if self.file_cache is None:
+            df = reader()
+        else:
+            columns = profile.name if profile is not None else None
+            df = self.file_cache.read(file_path, reader, columns=columns, content_hash=content_hash)
+        self._record_stage(stage, time.perf_counter() - start, len(df))
+        return df
+
     def load_master(self, file_path):
         try:
-            if file_path.endswith('.xlsx'):
-                df = pd.read_excel(file_path)
+            master_hash = file_hash(file_path)
+            stored = None
+            if self.store is not None:
+                # Already in the store; skip parsing the spreadsheet again
+                with self._timed('load_store'):
+                    stored, master_map = self.store.load_master(master_hash)
+            if stored is not None:
+                self.master_map = master_map
             else:
-                df = pd.read_csv(file_path)
-            
-            # Auto-detect columns
-            sku_col = self._detect_column(df, ['sku', 'stock', 'product_id'])
-            msku_col = self._detect_column(df, ['master_sku', 'parent_sku', 'base_product'])
-            
-            self.master_map = df[[sku_col, msku_col]]
-            self.master_map.columns = ['SKU', 'MSKU']
-            self.logger.info(f"Loaded master mapping with {len(self.master_map)} records")
+                df = self._read_file(file_path, master_hash, stage='parse_master')
+                
+                # Auto-detect columns
+                with self._timed('detect_columns'):
+                    sku_col = self._detect_column(df, ['sku', 'stock', 'product_id'])
+                    msku_col = self._detect_column(df, ['master_sku', 'parent_sku', 'base_product'])
+                
+                self.master_map = df[[sku_col, msku_col]]
+                self.master_map.columns = ['SKU', 'MSKU']
+                if self.store is not None:
+                    with self._timed('store_master', len(df)):
+                        self.store.replace_master(self.master_map, master_hash, source_name(file_path))
+            self._activate_master(master_hash)
             return True
         except Exception as e:
             self.logger.error(f"Error loading master file: {str(e)}")
             return False
 
+    def load_from_store(self):
+        # Startup path: the last master loaded, plus learned mappings and combos, with no file
+        if self.store is None:
+            return False
+        try:
+            with self._timed('load_store'):
+                master_hash, master_map = self.store.load_master()
+            if master_hash is None:
+                return False
+            self.master_map = master_map
+            self._activate_master(master_hash)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error loading mapping store: {str(e)}")
+            return False
+
+    def _activate_master(self, master_hash):
+        with self._timed('build_index', len(self.master_map)):
+            self._build_index()
+        if self.store is not None:
+            self.learned = self.store.learned()
+            self.combo_products.update(self.store.combos())
+        self.master_hash = master_hash
+        self._refresh_cache_version()
+        self.logger.info(f"Loaded master mapping with {len(self.master_map)} records")
+
+    def _build_index(self):
+        # Case-normalized SKU -> MSKU lookup; the first row wins on duplicates
+        keys = self.master_map['SKU'].astype(str).str.lower()
+        first = ~keys.duplicated()
+        self.sku_index = dict(zip(keys[first], self.master_map['MSKU'][first]))
+        self.fuzzy_index = FuzzyIndex(self.master_map['SKU'], self.master_map['MSKU'])
+
+    def _refresh_cache_version(self):
+        self.cache.set_version(MappingCache.make_version(self.master_hash, self.combo_products, self.learned))
+
+    def save_cache(self):
+        try:
+            self.cache.save()
+        except OSError as e:
+            self.logger.warning(f"Could not save mapping cache: {str(e)}")
+
+    def cache_stats(self):
+        return self.cache.stats()
+
     def _detect_column(self, df, keywords):
         for col in df.columns:
             if any(k in col.lower() for k in keywords):
                 return col
         return df.columns[0]
 
+    def sales_profile(self, file_path, marketplace=None):
+        # Known marketplace reports are matched by header instead of guessed column by column
+        with self._timed('detect_profile'):
+            profile, header_row = detect_profile(file_path, marketplace)
+        self.last_profile = profile
+        if profile is not None:
+            self.logger.info(f"Reading {source_name(file_path)} as {profile.name}")
+        return profile, header_row
+
+    def sku_column(self, df, profile=None):
+        col = profile.column('sku', df) if profile is not None else None
+        return col or self._detect_column(df, ['sku', 'item_sku', 'product_id'])
+
+    def _sku_pattern(self, marketplace=None, profile=None):
+        if profile is not None and profile.sku_pattern:
+            return profile.sku_pattern
+        return self.SKU_PATTERNS.get(marketplace, self.SKU_PATTERNS['default'])
+
     def validate_sku(self, sku, marketplace=None):
-        patterns = {
-            'amazon': r'^[A-Z0-9]{10}$',
-            'shopify': r'^[a-zA-Z0-9_\-]{5,}$',
-            'default': r'^[\w\-]{3,}$'
-        }
-        pattern = patterns.get(marketplace, patterns['default'])
-        return bool(re.match(pattern, sku))
+        # Combo SKUs ("SKU1+SKU2") are valid when every part is
+        pattern = self._sku_pattern(marketplace)
+        return all(re.match(pattern, part.strip()) for part in sku.split('+'))
+
+    def _valid_skus(self, skus, marketplace=None, profile=None):
+        pattern = self._sku_pattern(marketplace, profile)
+        valid = skus.str.match(pattern)
+        combo = ~valid & skus.str.contains('+', regex=False)
+        if combo.any():
+            valid[combo] = [
+                all(re.match(pattern, part.strip()) for part in sku.split('+'))
+                for sku in skus[combo]
+            ]
+        return valid
 
     def add_combo_product(self, sku_list, msku):
-        key = tuple(sorted(sku_list))
-        self.combo_products[key] = msku
-        self.logger.info(f"Added combo product: {key} -> {msku}")
+        self.add_combo_products([(sku_list, msku)])
+
+    def add_combo_products(self, combos):
+        # (sku_list, msku) pairs; the cache version hashes the whole combo table, so it
+        # is refreshed once per call rather than once per combo
+        added = [(tuple(sorted(sku_list)), msku) for sku_list, msku in combos]
+        self.combo_products.update(added)
+        if self.store is not None:
+            self.store.save_combos(added)
+        self._refresh_cache_version()
+        if len(added) == 1:
+            self.logger.info(f"Added combo product: {added[0][0]} -> {added[0][1]}")
+        else:
+            self.logger.info(f"Added {len(added)} combo products")
+
+    def confirm_mappings(self, pairs, marketplace=None):
+        # Operator-approved (sku, msku) pairs, usually fuzzy matches; from now on they
+        # resolve exactly whenever the master has no entry for the SKU
+        pairs = [(str(sku), msku) for sku, msku in pairs if msku is not None and msku == msku]
+        learned = self.learned.setdefault(market_key(marketplace), {})
+        for sku, msku in pairs:
+            learned[sku.lower()] = msku
+        if self.store is not None:
+            self.store.upsert_mappings(pairs, marketplace)
+        self._refresh_cache_version()
+        self.logger.info(f"Confirmed {len(pairs)} mappings")
+        return len(pairs)
+
+    def _learned_index(self, marketplace=None):
+        # Marketplace-specific confirmations override ones made for every marketplace
+        return {**self.learned.get('', {}), **self.learned.get(market_key(marketplace), {})}
 
     def auto_map(self, input_sku, marketplace=None):
+        # Validated against the marketplace pattern, so these entries are kept apart from
+        # the fallback ones, which _map_series reaches after validating with a profile's
+        key = ('auto', input_sku, marketplace)
+        cached = self.cache.get(key, _MISS)
+        if cached is not _MISS:
+            return cached
+        
+        msku = self._lookup(input_sku, marketplace)
+        self.cache.put(key, msku)
+        return msku
+
+    def _lookup(self, input_sku, marketplace=None):
         # Validate SKU format
         if not self.validate_sku(input_sku, marketplace):
-            self.logger.warning(f"Invalid SKU format: {input_sku}")
+            self.logger.debug(f"Invalid SKU format: {input_sku}")
             return None
         
         # Check for exact match
-        exact_match = self.master_map[self.master_map['SKU'].str.lower() == input_sku.lower()]
-        if not exact_match.empty:
-            return exact_match.iloc[0]['MSKU']
+        key = input_sku.lower()
+        if key in self.sku_index:
+            return self.sku_index[key]
+        
+        learned = self._learned_index(marketplace)
+        if key in learned:
+            return learned[key]
         
+        return self._fallback_map(input_sku)
+
+    def _combo_map(self, input_sku):
         # Check for combo products (e.g., "SKU1+SKU2")
         if '+' in input_sku:
             parts = [p.strip() for p in input_sku.split('+')]
             key = tuple(sorted(parts))
             if key in self.combo_products:
                 return self.combo_products[key]
+        return None
+
+    def _fallback_map(self, input_sku):
+        return self._fallback_map_many([input_sku])[input_sku]
+
+    def _fallback_map_many(self, input_skus):
+        results = {}
+        pending = []
+        distinct = set(input_skus)
+        with self._timed('combo_lookup', len(distinct)):
+            for sku in distinct:
+                combo = self._combo_map(sku)
+                if combo is not None:
+                    results[sku] = combo
+                else:
+                    pending.append(sku)
         
-        # Fuzzy matching
-        if not self.master_map.empty:
-            matches = process.extractBests(
-                input_sku, 
-                self.master_map['SKU'], 
-                scorer=fuzz.partial_ratio, 
-                score_cutoff=80
-            )
-            if matches:
-                best_match = matches[0][0]
-                return self.master_map[self.master_map['SKU'] == best_match].iloc[0]['MSKU']
+        # Fuzzy matching over the distinct SKUs left
+        if pending and self.fuzzy_index is not None and not self.master_map.empty:
+            with self._timed('fuzzy', len(pending)):
+                results.update(self.fuzzy_index.best_matches(pending))
         
-        self.logger.warning(f"No mapping found for SKU: {input_sku}")
-        return None
+        for sku in pending:
+            if results.get(sku) is None:
+                results[sku] = None
+                self.logger.debug(f"No mapping found for SKU: {sku}")
+        return results
 
-    def process_file(self, file_path, marketplace=None):
-        try:
-            if file_path.endswith('.xlsx'):
-                df = pd.read_excel(file_path)
+    def _cached_fallback_map_many(self, input_skus):
+        # Combo and fuzzy matches don't depend on the marketplace or its SKU pattern
+        results = {}
+        missing = []
+        for sku in input_skus:
+            cached = self.cache.get(('fallback', sku), _MISS)
+            if cached is _MISS:
+                missing.append(sku)
             else:
-                df = pd.read_csv(file_path)
+                results[sku] = cached
+        
+        if missing:
+            for sku, msku in self._fallback_map_many(missing).items():
+                self.cache.put(('fallback', sku), msku)
+                results[sku] = msku
+        return results
+
+    def _map_series(self, skus, marketplace=None, profile=None):
+        msku = pd.Series([None] * len(skus), index=skus.index, dtype=object)
+        skus = skus[skus.notna()].astype(str)
+        
+        with self._timed('validate', len(skus)):
+            skus = skus[self._valid_skus(skus, marketplace, profile)]
+        
+        # Resolve every exact match in one vectorized pass
+        with self._timed('exact_lookup', len(skus)):
+            keys = skus.str.lower()
+            exact = keys.map(self.sku_index)
+            hit = exact.notna()
+            # Confirmed matches fill in where the master has nothing
+            learned = self._learned_index(marketplace)
+            if learned:
+                exact = exact.where(hit, keys.map(learned))
+                hit = exact.notna()
+            msku.loc[exact.index[hit]] = exact[hit]
+        
+        # Only the leftovers go through the combo and fuzzy paths, once per distinct SKU
+        leftovers = skus[~hit]
+        resolved = self._cached_fallback_map_many(leftovers.unique())
+        msku.loc[leftovers.index] = leftovers.map(resolved)
+        return msku
+
+    def _count_unmapped(self, skus, mskus, marketplace=None, profile=None):
+        # (sku, reason) -> rows, for every row that ended up without an MSKU
+        skus = skus[mskus.isna()]
+        counts = Counter()
+        blank = skus.isna()
+        if blank.any():
+            counts[('', 'missing')] = int(blank.sum())
+        skus = skus[~blank].astype(str)
+        valid = self._valid_skus(skus, marketplace, profile)
+        for reason, part in (('invalid', skus[~valid]), ('unmapped', skus[valid])):
+            for sku, n in part.value_counts().items():
+                counts[(sku, reason)] += int(n)
+        return counts
+
+    def _log_unmapped(self, counts):
+        # One summary line per run instead of a warning per row
+        if not counts:
+            return
+        rows = Counter()
+        distinct = Counter()
+        for (_, reason), n in counts.items():
+            rows[reason] += n
+            distinct[reason] += 1
+        parts = [
+            f"{rows[reason]} {reason} rows ({distinct[reason]} distinct)"
+            for reason in ('unmapped', 'invalid', 'missing')
+            if rows[reason]
+        ]
+        top = ", ".join(f"{sku or '<blank>'} x{n}" for (sku, _), n in counts.most_common(5))
+        self.logger.warning(f"{'; '.join(parts)}. Most frequent: {top}")
+
+    def build_report(self, counts=None):
+        counts = self.last_unmapped if counts is None else counts
+        ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0][1], item[0][0]))
+        records = []
+        for i, ((sku, reason), n) in enumerate(ordered):
+            candidate = None
+            if i < self.REPORT_CANDIDATES and sku and self.fuzzy_index is not None:
+                candidate = self.fuzzy_index.nearest(sku)
+            best_candidate, candidate_msku, score = candidate or (None, None, None)
+            records.append((sku, reason, n, best_candidate, candidate_msku, score))
+        return pd.DataFrame.from_records(records, columns=self.REPORT_COLUMNS)
+
+    def process_file(self, file_path, marketplace=None, with_report=False):
+        try:
+            profile, header_row = self.sales_profile(file_path, marketplace)
+            df = self._read_file(file_path, profile=profile, header_row=header_row)
             
-            # Auto-detect SKU column
-            sku_col = self._detect_column(df, ['sku', 'item_sku', 'product_id'])
+            with self._timed('detect_columns'):
+                sku_col = self.sku_column(df, profile)
             
             # Apply mapping
-            df['MSKU'] = df[sku_col].apply(
-                lambda x: self.auto_map(str(x), marketplace) if pd.notna(x) else None
-            )
+            df['MSKU'] = self._map_series(df[sku_col], marketplace, profile)
             
-            # Log unmapped SKUs
-            unmapped = df[df['MSKU'].isna()]
-            if not unmapped.empty:
-                self.logger.warning(f"{len(unmapped)} unmapped SKUs found")
+            # Summarize unmapped SKUs
+            self.last_unmapped = self._count_unmapped(df[sku_col], df['MSKU'], marketplace, profile)
+            self._log_unmapped(self.last_unmapped)
             
+            self._finish_run()
+            if with_report:
+                return df, self.build_report()
             return df
         except Exception as e:
             self.logger.error(f"Error processing file: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def _finish_run(self):
+        self.save_cache()
+        stats = self.cache.stats()
+        self.logger.info(
+            f"Mapping cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['size']} entries"
+        )
+
+    def _iter_excel_chunks(self, file_path, chunksize, header_row=0):
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(rewind(file_path), read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(min_row=header_row + 1, values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+            
+            batch = []
+            offset = 0
+            for row in rows:
+                batch.append(row)
+                if len(batch) == chunksize:
+                    yield pd.DataFrame(batch, columns=columns, index=range(offset, offset + len(batch)))
+                    offset += len(batch)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns, index=range(offset, offset + len(batch)))
+        finally:
+            workbook.close()
+
+    def _iter_chunks(self, file_path, chunksize, profile=None, header_row=0):
+        if source_name(file_path).endswith('.xlsx'):
+            chunks = self._iter_excel_chunks(file_path, chunksize, header_row)
+            if profile is not None:
+                chunks = map(profile.coerce, chunks)
+        elif profile is not None:
+            chunks = profile.read_csv_chunks(file_path, chunksize, header_row)
+        else:
+            chunks = pd.read_csv(rewind(file_path), chunksize=chunksize)
+        return self._timed_chunks(iter(chunks))
+
+    def _timed_chunks(self, chunks):
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            self._record_stage('parse', time.perf_counter() - start, len(chunk))
+            yield chunk
+
+    def process_file_chunks(self, file_path, marketplace=None, chunksize=100000):
+        # Generator variant of process_file: peak memory is one chunk
+        summary = {'rows': 0, 'unmapped': 0, 'chunks': 0}
+        self.last_summary = summary
+        self.last_unmapped = Counter()
+        sku_col = None
+        profile, header_row = self.sales_profile(file_path, marketplace)
+        for chunk in self._iter_chunks(file_path, chunksize, profile, header_row):
+            if sku_col is None:
+                sku_col = self.sku_column(chunk, profile)
+            
+            chunk['MSKU'] = self._map_series(chunk[sku_col], marketplace, profile)
+            summary['rows'] += len(chunk)
+            summary['unmapped'] += int(chunk['MSKU'].isna().sum())
+            self.last_unmapped.update(
+                self._count_unmapped(chunk[sku_col], chunk['MSKU'], marketplace, profile)
+            )
+            summary['chunks'] += 1
+            yield chunk
+        
+        self._log_unmapped(self.last_unmapped)
+        self._finish_run()
+
+    def _parquet_schema(self, table, chunk):
+        import pyarrow as pa
+        
+        # Fixed from the first chunk, so it must hold what later chunks bring: MSKU is
+        # always text, so are columns with no values yet (read_csv types those as float),
+        # and categoricals become their value type
+        empty = set(chunk.columns[chunk.isna().all().to_numpy()])
+        fields = []
+        for field in table.schema:
+            if field.name == 'MSKU' or field.name in empty or pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            elif pa.types.is_dictionary(field.type):
+                field = field.with_type(field.type.value_type)
+            fields.append(field.with_nullable(True))
+        return pa.schema(fields)
+
+    def process_file_to(self, file_path, output_path, marketplace=None, chunksize=100000):
+        writer = None
+        try:
+            chunks = self.process_file_chunks(file_path, marketplace, chunksize)
+            if output_path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, self._parquet_schema(table, chunk))
+                    # Each chunk infers its own types; casting lines them up with the file's
+                    writer.write_table(table.cast(writer.schema))
+            else:
+                for i, chunk in enumerate(chunks):
+                    chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            
+            self.logger.info(f"Wrote {self.last_summary['rows']} mapped rows to {output_path}")
+            return self.last_summary
+        except Exception as e:
+            self.logger.error(f"Error processing file: {str(e)}")
+            return None
+        finally:
+            if writer is not None:
+                writer.close()
\ No newline at end of file
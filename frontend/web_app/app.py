@@ -9,8 +9,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'
 
 # ✅ Now import modules from backend
 from data_processor import process_sales_data
-from backend.api.schemas import ExportRequest
+from sales_metrics import DEFAULT_AGGREGATES_PATH, SalesAggregates
 from backend.database.database_connector import BaserowConnector
+from backend.stage_metrics import stage_metrics
+from gui_app.file_cache import file_hash
+from gui_app.mapping_store import MappingStore
+
+# Processed results kept in memory, shared by every session of this server
+RESULT_CACHE_ENTRIES = 8
+
+# Keyed on content hashes, marketplace and the learned-mapping version; the underscored
+# upload buffers are not hashed by Streamlit
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, show_spinner=False)
+def process_uploads(master_hash, sales_hashes, marketplace, learned_version, _master_file, _sales_files, _misses):
+    _misses.append(master_hash)
+    return process_sales_data(
+        _master_file, _sales_files, marketplace, workers=os.cpu_count() or 1, sales_hashes=sales_hashes
+    )
 
 # Initialize session state
 def init_session():
@@ -52,21 +67,24 @@ st.title("Warehouse Management Dashboard")
 if process_btn and master_file and sales_files:
     with st.spinner("Processing data..."):
         try:
-            os.makedirs("temp", exist_ok=True)
-            master_path = f"temp/{master_file.name}"
-            with open(master_path, "wb") as f:
-                f.write(master_file.getbuffer())
-            
-            sales_paths = []
-            for file in sales_files:
-                path = f"temp/{file.name}"
-                with open(path, "wb") as f:
-                    f.write(file.getbuffer())
-                sales_paths.append(path)
-            
-            result = process_sales_data(master_path, sales_paths, marketplace)
+            # Uploads are read straight from memory; nothing is written to a shared temp dir
+            with stage_metrics.timer('dashboard', 'hash_uploads'):
+                master_hash = file_hash(master_file)
+                sales_hashes = tuple(file_hash(file) for file in sales_files)
+            misses = []
+            learned_version = MappingStore().learned_version()
+            result = process_uploads(
+                master_hash, sales_hashes, marketplace, learned_version, master_file, sales_files, misses
+            )
+            stage_metrics.record_cache('dashboard', 'processed_uploads', hits=int(not misses), misses=len(misses))
             st.session_state.processed_data = result['data']
             st.session_state.metrics = result['metrics']
+            st.session_state.unmapped_report = result['unmapped_report']
+            # Outside the result cache; files already in the saved totals are skipped
+            with stage_metrics.timer('dashboard', 'merge_aggregates'):
+                history = SalesAggregates.merge_saved(DEFAULT_AGGREGATES_PATH, result['partials'])
+            st.session_state.history_metrics = history.metrics()
+            st.session_state.history_files = len(history.sources)
             st.success("Data processed successfully!")
         except Exception as e:
             st.error(f"Error processing data: {str(e)}")
@@ -80,19 +98,36 @@ if st.session_state.processed_data is not None:
     cols[2].metric("Unique Products", st.session_state.metrics['unique_products'])
     cols[3].metric("Avg Order Value", f"${st.session_state.metrics['avg_order_value']:,.2f}")
     
+    history = st.session_state.get('history_metrics')
+    if history is not None:
+        st.caption(f"All uploads to date ({st.session_state.history_files} files)")
+        cols = st.columns(4)
+        cols[0].metric("Total Orders", history['total_orders'])
+        cols[1].metric("Total Revenue", f"${history['total_revenue']:,.2f}")
+        cols[2].metric("Unique Products", history['unique_products'])
+        cols[3].metric("Avg Order Value", f"${history['avg_order_value']:,.2f}")
+    
     st.subheader("Processed Data Preview")
     st.dataframe(st.session_state.processed_data.head(50))
     
+    report = st.session_state.get('unmapped_report')
+    if report is not None and not report.empty:
+        with st.expander(f"Unmapped SKUs ({int(report['count'].sum())} rows, {len(report)} distinct)"):
+            st.dataframe(report, hide_index=True)
+            st.download_button("Download report", report.to_csv(index=False), "unmapped_skus.csv", "text/csv")
+    
     if st.session_state.get('baserow_connected', False):
+        key_fields = st.text_input("Sync key fields (comma separated, leave empty to replace the table)")
         if st.button("Export to Baserow"):
             with st.spinner("Exporting data..."):
                 try:
-                    request = ExportRequest(
-                        table_id=table_id,
-                        data=st.session_state.processed_data.to_dict(orient='records')
+                    # Rows are serialized one batch at a time straight from the frame
+                    counts = st.session_state.connector.export_frame(
+                        table_id,
+                        st.session_state.processed_data,
+                        key_fields=[f.strip() for f in key_fields.split(",") if f.strip()] or None
                     )
-                    st.session_state.connector.export_data(request)
-                    st.success("Data exported to Baserow successfully!")
+                    st.success(f"Data exported to Baserow successfully! {counts}")
                 except Exception as e:
                     st.error(f"Export failed: {str(e)}")
     else:
@@ -108,7 +143,11 @@ if st.session_state.get('baserow_connected', False):
         with st.spinner("Processing your query..."):
             try:
                 from backend.ai_layer.query_processor import AIQueryProcessor
-                processor = AIQueryProcessor(st.session_state.connector)
+                # One long-lived processor per connection so follow-ups reuse the table snapshot
+                processor = st.session_state.get('ai_processor')
+                if processor is None or processor.connector is not st.session_state.connector:
+                    processor = AIQueryProcessor(st.session_state.connector)
+                    st.session_state.ai_processor = processor
                 result = processor.process_query(query, table_id)
                 
                 if result.get('type') == 'text':
@@ -121,3 +160,20 @@ if st.session_state.get('baserow_connected', False):
                 st.error(f"Query processing error: {str(e)}")
 else:
     st.info("Connect to Baserow to enable AI insights")
+
+# Timing breakdown for everything this server process has run
+st.divider()
+with st.expander("Timing breakdown"):
+    stages = pd.DataFrame(stage_metrics.stages())
+    if stages.empty:
+        st.info("No timings recorded yet")
+    else:
+        stages['share'] = stages['seconds'] / stages.groupby('component')['seconds'].transform('sum')
+        st.dataframe(stages.sort_values(['component', 'seconds'], ascending=[True, False]), hide_index=True)
+        st.bar_chart(stages.set_index(stages['component'] + ' / ' + stages['stage'])['seconds'])
+    caches = pd.DataFrame(stage_metrics.caches())
+    if not caches.empty:
+        st.dataframe(caches, hide_index=True)
+    if st.button("Reset timings"):
+        stage_metrics.reset()
+        st.rerun()
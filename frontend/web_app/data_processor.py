@@ -3,10 +3,93 @@ import os
 
 # Add parent folder (frontend) to sys.path so gui_app can be imported
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# ...and the repo root so the backend rollups can be
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from gui_app.sku_mapper import SKUMapper
+from gui_app.mapping_cache import DEFAULT_CACHE_PATH
+from gui_app.file_cache import ParsedFileCache, file_hash, rewind
+from gui_app.mapping_store import MappingStore
+from gui_app.report_profiles import detect_profile
+from sales_metrics import SalesAggregates
+from backend.stage_metrics import stage_metrics
+
+# Below this much input, forking the pool and pickling the master cost more than they save
+PARALLEL_MIN_BYTES = 32 * 1024 ** 2
+
+# Set once per pool worker by _init_worker so the master index is not re-pickled per task
+_worker_mapper = None
+
+def _init_worker(mapper):
+    global _worker_mapper
+    _worker_mapper = mapper
+    # A forked worker inherits whatever the parent timed before the fork
+    _worker_mapper.drain_stage_times()
+    # Workers send new mapping-cache entries back; only the parent writes the cache file
+    _worker_mapper.cache.path = None
+    _worker_mapper.cache.track_added()
+
+# Workers return their stage timings and new cache entries with each result;
+# the registry and the cache file live in the parent
+def _map_file(path, marketplace):
+    df = _worker_mapper.process_file(path, marketplace)
+    return df, _worker_mapper.drain_stage_times(), _worker_mapper.cache.drain_added()
+
+def _map_chunk(chunk, sku_col, marketplace, profile):
+    chunk['MSKU'] = _worker_mapper._map_series(chunk[sku_col], marketplace, profile)
+    return chunk, _worker_mapper.drain_stage_times(), _worker_mapper.cache.drain_added()
+
+def _collect(mapper, results):
+    frames = []
+    for df, report, added in results:
+        stage_metrics.merge('sku_mapper', report)
+        for key, msku in added.items():
+            mapper.cache.put(key, msku)
+        frames.append(df)
+    return frames
+
+def _source_size(path):
+    if isinstance(path, str):
+        return os.path.getsize(path)
+    size = rewind(path).seek(0, os.SEEK_END)
+    rewind(path)
+    return size
+
+def _pool(mapper, workers):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mapper,))
+
+def _map_parallel(mapper, sales_paths, marketplace, workers, chunksize):
+    if len(sales_paths) > 1:
+        with _pool(mapper, workers) as pool:
+            return _collect(mapper, pool.map(_map_file, sales_paths, [marketplace] * len(sales_paths)))
+    
+    # A single report is split into chunks instead; map() keeps them in order
+    try:
+        profile, header_row = mapper.sales_profile(sales_paths[0], marketplace)
+        chunks = mapper._iter_chunks(sales_paths[0], chunksize, profile, header_row)
+        first = next(chunks, None)
+        if first is None:
+            return [None]
+        sku_col = mapper.sku_column(first, profile)
+        
+        second = next(chunks, None)
+        if second is None:
+            # A report that fits in one chunk is mapped here rather than in a pool
+            first['MSKU'] = mapper._map_series(first[sku_col], marketplace, profile)
+            return [first]
+        
+        tasks = chain([first, second], chunks)
+        with _pool(mapper, workers) as pool:
+            mapped = _collect(mapper, pool.map(_map_chunk, tasks, repeat(sku_col), repeat(marketplace), repeat(profile)))
+        with stage_metrics.timer('process_sales_data', 'concat_chunks', sum(map(len, mapped))):
+            return [pd.concat(mapped)]
+    except Exception as e:
+        mapper.logger.error(f"Error processing file: {str(e)}")
+        return [None]
 
 def auto_detect_column(df, keywords):
     for col in df.columns:
@@ -14,49 +97,93 @@ def auto_detect_column(df, keywords):
             return col
     return None
 
-def process_sales_data(master_path, sales_paths, marketplace):
-    mapper = SKUMapper()
-    if not mapper.load_master(master_path):
-        raise Exception("Failed to load master SKUs")
+def profile_column(df, profiles, role, keywords):
+    # Columns declared by a matched report profile win over keyword guessing
+    for profile in profiles:
+        col = profile.column(role, df)
+        if col:
+            return col
+    return auto_detect_column(df, keywords)
+
+def process_sales_data(master_path, sales_paths, marketplace, workers=1, chunksize=100000,
+                       aggregates_path=None, sales_hashes=None):
+    mapper = SKUMapper(cache_path=DEFAULT_CACHE_PATH, file_cache=ParsedFileCache(), store=MappingStore())
+    with stage_metrics.timer('process_sales_data', 'load_master'):
+        if not mapper.load_master(master_path):
+            raise Exception("Failed to load master SKUs")
+    # Drained before the pool copies the mapper, so workers report only their own work
+    stage_metrics.merge('sku_mapper', mapper.drain_stage_times())
     
-    all_data = []
-    for path in sales_paths:
-        df = mapper.process_file(path, marketplace)
-        if df is not None:
-            all_data.append(df)
+    with stage_metrics.timer('process_sales_data', 'map') as timing:
+        if workers > 1 and sales_paths and sum(map(_source_size, sales_paths)) >= PARALLEL_MIN_BYTES:
+            results = _map_parallel(mapper, sales_paths, marketplace, workers, chunksize)
+            # Workers don't write the cache file; their entries were merged in by _collect
+            mapper._finish_run()
+        else:
+            results = [mapper.process_file(path, marketplace) for path in sales_paths]
+        stage_metrics.merge('sku_mapper', mapper.drain_stage_times())
+        # One result per path, None where a file failed
+        frames = [(i, df) for i, df in enumerate(results) if df is not None]
+        all_data = [df for _, df in frames]
+        timing.rows = sum(map(len, all_data))
     
-    combined = pd.concat(all_data) if all_data else pd.DataFrame()
+    with stage_metrics.timer('process_sales_data', 'concat', timing.rows):
+        combined = pd.concat(all_data) if all_data else pd.DataFrame()
     
-    metrics = {}
+    # Only the new files are aggregated, one partial per file keyed by its content hash,
+    # so earlier totals merged in from disk never count the same file twice
+    partials = []
+    unmapped_report = pd.DataFrame(columns=SKUMapper.REPORT_COLUMNS)
     if not combined.empty:
+        # Header sniffing only reads a few lines, so it is cheap to redo here in the parent
+        with stage_metrics.timer('process_sales_data', 'detect_profiles'):
+            profiles = [p for p, _ in (detect_profile(path, marketplace) for path in sales_paths) if p]
+        
+        with stage_metrics.timer('process_sales_data', 'unmapped_report'):
+            sku_col = profile_column(combined, profiles, 'sku', ['sku', 'item_sku', 'product_id'])
+            sku_col = sku_col or mapper._detect_column(combined, ['sku', 'item_sku', 'product_id'])
+            unmapped_report = mapper.build_report(
+                mapper._count_unmapped(
+                    combined[sku_col], combined['MSKU'], marketplace, profiles[0] if profiles else None
+                )
+            )
+        
         # Auto-detect columns
-        order_id_col = auto_detect_column(combined, ['order', 'id'])
-        price_col = auto_detect_column(combined, ['price', 'amount', 'revenue'])
+        with stage_metrics.timer('process_sales_data', 'detect_columns'):
+            order_id_col = profile_column(combined, profiles, 'order_id', ['order', 'id'])
+            price_col = profile_column(combined, profiles, 'price', ['price', 'amount', 'revenue'])
+            date_col = profile_column(combined, profiles, 'date', ['date'])
+            fulfillment_center_col = profile_column(
+                combined, profiles, 'fulfillment_center', ['fulfillment', 'warehouse']
+            )
         
         if not order_id_col or not price_col:
             raise Exception("Could not detect required columns in sales data")
         
-        # Calculate metrics
-        total_orders = combined[order_id_col].nunique()
-        total_revenue = combined[price_col].sum()
-        unique_products = combined['MSKU'].nunique()
-        avg_order_value = total_revenue / total_orders if total_orders else 0
-        
-        metrics = {
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'unique_products': unique_products,
-            'avg_order_value': avg_order_value
-        }
+        with stage_metrics.timer('process_sales_data', 'aggregate', len(combined)):
+            for i, df in frames:
+                partials.append(SalesAggregates.from_frame(
+                    df,
+                    order_id_col,
+                    price_col,
+                    date_col=date_col,
+                    fulfillment_center_col=fulfillment_center_col,
+                    marketplace=marketplace,
+                    source=sales_hashes[i] if sales_hashes else file_hash(sales_paths[i])
+                ))
+    
+    if aggregates_path:
+        with stage_metrics.timer('process_sales_data', 'merge_aggregates'):
+            aggregates = SalesAggregates.merge_saved(aggregates_path, partials)
     else:
-        metrics = {
-            'total_orders': 0,
-            'total_revenue': 0,
-            'unique_products': 0,
-            'avg_order_value': 0
-        }
+        aggregates = SalesAggregates()
+        for partial in partials:
+            aggregates.merge(partial)
     
     return {
         'data': combined,
-        'metrics': metrics
+        'metrics': aggregates.metrics(),
+        'aggregates': aggregates,
+        'partials': partials,
+        'unmapped_report': unmapped_report
     }
@@ -0,0 +1,70 @@
+import os
+import pickle
+import threading
+
+from backend.ai_layer.rollups import SalesRollups
+
+DEFAULT_AGGREGATES_PATH = os.path.join(os.path.expanduser("~"), ".warehouse_mvp", "sales_aggregates.pkl")
+
+# Streamlit sessions share one process, so load-merge-save must not interleave
+_saved_lock = threading.Lock()
+
+class SalesAggregates:
+    def __init__(self, rollups=None, source=None):
+        self.row_count = 0
+        self.rollups = rollups or SalesRollups()
+        # Content hashes of the files counted so far; merging one of them again is a no-op
+        self.sources = {source} if source else set()
+
+    @classmethod
+    def from_frame(cls, df, order_id_col, price_col, date_col=None, fulfillment_center_col=None,
+                   marketplace=None, source=None):
+        rollups = SalesRollups(
+            order_col=order_id_col,
+            price_col=price_col,
+            date_col=date_col,
+            msku_col='MSKU',
+            marketplace_col=None,
+            fulfillment_center_col=fulfillment_center_col
+        )
+        agg = cls(rollups.update(df, marketplace), source)
+        agg.row_count = len(df)
+        return agg
+
+    def merge(self, other):
+        # Partials carry one source each, so a file is either counted whole or skipped
+        if other.sources and other.sources <= self.sources:
+            return self
+        self.row_count += other.row_count
+        self.rollups.merge(other.rollups)
+        self.sources |= other.sources
+        return self
+
+    @classmethod
+    def merge_saved(cls, path, partials):
+        with _saved_lock:
+            aggregates = cls.load(path)
+            for partial in partials:
+                aggregates.merge(partial)
+            aggregates.save(path)
+        return aggregates
+
+    def metrics(self):
+        return self.rollups.totals()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "rb") as f:
+            aggregates = pickle.load(f)
+        # Saved before sources were tracked
+        aggregates.__dict__.setdefault('sources', set())
+        return aggregates
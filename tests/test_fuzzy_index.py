@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+
+import pandas as pd
+from thefuzz import fuzz, process, utils
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "frontend"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from gui_app.sku_mapper import FuzzyIndex
+from synthetic_data import generate_master
+
+def full_scan(index, sku):
+    # What fallback matching did before the n-gram index: every master SKU is scored
+    choices = {pos: choice for pos, choice in enumerate(index.choices) if choice is not None}
+    match = process.extractOne(
+        utils.full_process(sku), choices, processor=None,
+        scorer=fuzz.partial_ratio, score_cutoff=index.score_cutoff
+    )
+    return index.msku_by_sku[index.skus[match[2]]] if match else None
+
+def edit(sku, rng):
+    pos = rng.randrange(len(sku))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return sku[:pos] + sku[pos + 1:]
+    if kind == 1:
+        return sku[:pos] + rng.choice("XQZ79") + sku[pos + 1:]
+    if kind == 2:
+        return sku[:pos] + rng.choice("-_ ") + sku[pos:]
+    return sku[pos:pos + rng.randrange(2, 12)]
+
+def test_pruned_matches_equal_full_scan():
+    rng = random.Random(0)
+    master = generate_master(2000, seed=3)
+    # Short and odd master SKUs exercise the length < 4 paths
+    extra = pd.DataFrame({"sku": ["AB", "X1", "ZZZ", "q-7", None], "master_sku": ["S1", "S2", "S3", "S4", "S5"]})
+    master = pd.concat([master, extra], ignore_index=True)
+    index = FuzzyIndex(master["sku"], master["master_sku"])
+
+    skus = master["sku"].dropna().tolist()
+    queries = [edit(edit(rng.choice(skus), rng), rng) for _ in range(300)]
+    queries += ["".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_") for _ in range(rng.randrange(1, 25)))
+                for _ in range(100)]
+    queries += ["", "zz", "AB", "CSTE", "TOY_0000", "q 7"]
+
+    mismatches = {q: (index.best_match(q), full_scan(index, q)) for q in queries}
+    mismatches = {q: pair for q, pair in mismatches.items() if pair[0] != pair[1]}
+    assert not mismatches